@@ -1,81 +1,34 @@
 from __future__ import annotations
+import csv
+import io
+import math
 import os
-import sys
-from dataclasses import dataclass, asdict
-from datetime import datetime, timezone
-from typing import Optional, List
-import json
-
-from dotenv import load_dotenv
-import firebase_admin
-from firebase_admin import credentials, firestore
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
-
-# ── bootstrap
-load_dotenv()
-sa_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-project_id = os.getenv("FIREBASE_PROJECT_ID")
-
-if not sa_path or not os.path.exists(sa_path):
-    print("ERROR: Set GOOGLE_APPLICATION_CREDENTIALS in .env to your service account JSON path.")
-    sys.exit(1)
-
-if not project_id:
-    print("ERROR: Set FIREBASE_PROJECT_ID in .env to your Firebase project id.")
-    sys.exit(1)
-
-cred = credentials.Certificate(sa_path)
-firebase_admin.initialize_app(cred, {"projectId": project_id})
-db = firestore.client()
-
-# ── data classes (with fixed deprecation warnings)
-@dataclass
-class University:
-    name: str
-    domain: Optional[str] = None
-    createdAt: datetime = None
-
-    def __post_init__(self):
-        if self.createdAt is None:
-            self.createdAt = datetime.now(timezone.utc)
-
-@dataclass
-class Club:
-    name: str
-    universityId: str
-    description: Optional[str] = None
-    createdAt: datetime = None
-
-    def __post_init__(self):
-        if self.createdAt is None:
-            self.createdAt = datetime.now(timezone.utc)
-
-@dataclass
-class Person:
-    name: str
-    email: Optional[str] = None
-    studentId: Optional[str] = None
-    createdAt: datetime = None
-
-    def __post_init__(self):
-        if self.createdAt is None:
-            self.createdAt = datetime.now(timezone.utc)
-
-@dataclass
-class Membership:
-    personId: str
-    role: str = "member"         # "owner"|"officer"|"member"
-    status: str = "active"       # "active"|"inactive"
-    title: Optional[str] = None
-    createdAt: datetime = None
-
-    def __post_init__(self):
-        if self.createdAt is None:
-            self.createdAt = datetime.now(timezone.utc)
+import time
+from datetime import datetime
+
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, flash, g
+from flask.signals import before_render_template, template_rendered
+
+from data import aio, opstats
+from data import Club, ClubRepo, Membership, MembershipRepo, Person, PersonRepo, University, UniversityRepo
+from data.bulk_import import is_jsonl, iter_rows
+from data.cache import make_cache
+from data.client import async_db, db, on_client_loop
+from data.export import FORMATS, export_lines
+from data.fanout import run_all
+from data.lookups import GET_ALL_CHUNK_SIZE
+from data.metrics import CONTENT_TYPE, FAST_BUCKETS, Registry
+from data.opstats import Budget, BudgetExceeded
+from data.pagination import clamp_page_size
+from data.replica import start_replicas
+from data.stats import collect_stats
+from data.uniqueness import DuplicateValue
 
 # ── Flask app
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-in-production'
+app.config['FIRESTORE_BUDGET_STRICT'] = os.getenv('FIRESTORE_BUDGET_STRICT', '').lower() in ('1', 'true', 'yes')
+app.logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
 
 # ── Helper functions
 def doc_to_dict_with_id(doc):
@@ -92,18 +45,165 @@ def format_datetime(dt):
 
 app.jinja_env.filters['datetime'] = format_datetime
 
+def page_from_request(repo):
+    """Fetch the page of `repo` selected by the after/before/size request args"""
+    page = repo.page(
+        page_size=clamp_page_size(request.args.get('size')),
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+    )
+    return page, [doc_to_dict_with_id(doc) for doc in page.items]
+
+# ── Repositories
+# Universities change rarely; the repo invalidates this cache on every write
+universities_cache = make_cache("universities", ttl_seconds=float(os.getenv("UNIVERSITIES_CACHE_TTL", "300")))
+
+# Dashboard totals are allowed to be slightly stale
+stats_cache = make_cache("stats", ttl_seconds=float(os.getenv("STATS_CACHE_TTL", "60")))
+
+CACHES = {'universities': universities_cache, 'stats': stats_cache}
+
+def invalidate_caches(*names):
+    """Drop the named caches after a write; with CACHE_BACKEND=redis every worker sees it"""
+    for name in names:
+        CACHES[name].invalidate()
+
+# Optional snapshot-listener replicas of small collections, e.g. "universities,clubs"
+replicas = start_replicas(db, [name.strip() for name in os.getenv("FIRESTORE_LISTENERS", "").split(",") if name.strip()])
+
+universities_repo = UniversityRepo(db, cache=universities_cache, replica=replicas.get("universities"))
+clubs_repo = ClubRepo(db, replica=replicas.get("clubs"))
+people_repo = PersonRepo(db)
+memberships_repo = MembershipRepo(db, club_names=clubs_repo.names_by_id)
+
+def get_universities():
+    """All universities ordered by name, read through the cache"""
+    return [doc_to_dict_with_id(doc) for doc in universities_repo.list_all()]
+
+# ── Firestore usage per request
+# Round-trip budgets for the read-heavy pages. Going over is logged, or raised
+# as BudgetExceeded when FIRESTORE_BUDGET_STRICT is set (tests, CI).
+ROUTE_BUDGETS = {
+    'index': Budget(calls=4),
+    'universities': Budget(calls=1),
+    'clubs': Budget(calls=3),
+    'people': Budget(calls=1),
+    'person_detail': Budget(calls=3),
+    'api_person_clubs': Budget(calls=3),
+    'api_search_people': Budget(calls=3),
+}
+
+def roster_budget(members) -> Budget:
+    """club + roster query + one batched people read per GET_ALL_CHUNK_SIZE distinct members"""
+    people = {member.get('personId') for member in members if member.get('personId')}
+    return Budget(calls=2 + math.ceil(len(people) / GET_ALL_CHUNK_SIZE))
+
+@app.before_request
+def start_op_stats():
+    g.op_stats_token = opstats.start()
+
+@app.after_request
+def report_op_stats(response):
+    stats = opstats.current()
+    if stats is None:
+        return response
+    response.headers['X-Firestore-Ops'] = stats.header_value()
+    app.logger.info('%s %s %s firestore %s', request.method, request.path, response.status_code, stats.header_value())
+
+    # Views whose cost grows with their data set g.firestore_budget themselves
+    budget = g.get('firestore_budget') or ROUTE_BUDGETS.get(request.endpoint)
+    # Error responses are left alone; raising again would only mask the original error
+    problems = budget.violations(stats) if budget and response.status_code < 500 else []
+    if problems:
+        message = f"Firestore budget exceeded on {request.endpoint}: {', '.join(problems)}"
+        if app.config['FIRESTORE_BUDGET_STRICT']:
+            raise BudgetExceeded(message)
+        app.logger.warning(message)
+    return response
+
+@app.teardown_request
+def stop_op_stats(exc):
+    token = g.pop('op_stats_token', None)
+    if token is not None:
+        opstats.stop(token)
+
+# ── Metrics
+metrics = Registry()
+request_seconds = metrics.histogram(
+    'http_request_duration_seconds', 'Time to serve a request, by endpoint', ('endpoint', 'method'))
+requests_total = metrics.counter(
+    'http_requests_total', 'Requests served, by endpoint and status', ('endpoint', 'method', 'status'))
+firestore_seconds = metrics.histogram(
+    'firestore_call_duration_seconds', 'Firestore round-trip latency', ('op', 'collection'), FAST_BUCKETS)
+firestore_reads = metrics.counter(
+    'firestore_documents_read_total', 'Documents read (as billed)', ('op', 'collection'))
+firestore_writes = metrics.counter(
+    'firestore_documents_written_total', 'Documents written', ('op', 'collection'))
+template_seconds = metrics.histogram(
+    'template_render_duration_seconds', 'Jinja template render time', ('template',), FAST_BUCKETS)
+
+def cache_samples(field):
+    # Shared backends do not report a size, so that sample is left out for them
+    return lambda: {(name,): value for name, cache in CACHES.items()
+                    if (value := cache.stats()[field]) is not None}
+
+metrics.collected_counter('cache_hits_total', 'Cache hits since start', ('cache',), cache_samples('hits'))
+metrics.collected_counter('cache_misses_total', 'Cache misses since start', ('cache',), cache_samples('misses'))
+metrics.gauge('cache_hit_ratio', 'Cache hits / lookups since start', ('cache',), cache_samples('hitRatio'))
+metrics.gauge('cache_entries', 'Entries currently cached', ('cache',), cache_samples('size'))
+
+def replica_samples(field):
+    return lambda: {(name,): float(replica.stats()[field]) for name, replica in replicas.items()}
+
+metrics.gauge('replica_healthy', '1 while the collection replica is serving reads', ('collection',),
+              replica_samples('healthy'))
+metrics.gauge('replica_documents', 'Documents held by the collection replica', ('collection',),
+              replica_samples('documents'))
+
+def observe_firestore_call(op, collection, reads, writes, seconds):
+    firestore_seconds.observe(seconds, op=op, collection=collection)
+    if reads:
+        firestore_reads.inc(reads, op=op, collection=collection)
+    if writes:
+        firestore_writes.inc(writes, op=op, collection=collection)
+
+opstats.add_listener(observe_firestore_call)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request(response):
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        request_seconds.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+        requests_total.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+@before_render_template.connect_via(app)
+def start_template_timer(sender, template, context, **extra):
+    g.setdefault('template_started', []).append(time.perf_counter())
+
+@template_rendered.connect_via(app)
+def observe_template(sender, template, context, **extra):
+    stack = g.get('template_started')
+    if stack:
+        template_seconds.observe(time.perf_counter() - stack.pop(), template=template.name)
+
 # ── Routes
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    stats = stats_cache.get_or_load("dashboard", lambda: collect_stats(db))
+    return render_template('index.html', stats=stats)
 
 # ── University routes
 @app.route('/universities')
 def universities():
-    docs = list(db.collection("universities").order_by("name").stream())
-    universities_data = [doc_to_dict_with_id(doc) for doc in docs]
-    return render_template('universities.html', universities=universities_data)
+    page, universities_data = page_from_request(universities_repo)
+    return render_template('universities.html', universities=universities_data, page=page)
 
 @app.route('/universities/create', methods=['GET', 'POST'])
 def create_university():
@@ -115,8 +215,8 @@ def create_university():
             flash('University name is required', 'error')
             return render_template('create_university.html')
         
-        ref = db.collection("universities").document()
-        ref.set(asdict(University(name=name, domain=domain)))
+        universities_repo.add(University(name=name, domain=domain))
+        invalidate_caches('stats')
         flash(f'University "{name}" created successfully!', 'success')
         return redirect(url_for('universities'))
     
@@ -124,8 +224,8 @@ def create_university():
 
 @app.route('/universities/<university_id>/edit', methods=['GET', 'POST'])
 def edit_university(university_id):
-    doc = db.collection("universities").document(university_id).get()
-    if not doc.exists:
+    doc = universities_repo.get(university_id)
+    if not doc:
         flash('University not found', 'error')
         return redirect(url_for('universities'))
     
@@ -137,7 +237,7 @@ def edit_university(university_id):
             flash('University name is required', 'error')
             return render_template('edit_university.html', university=doc_to_dict_with_id(doc))
         
-        doc.reference.update({"name": name, "domain": domain})
+        universities_repo.update(university_id, {"name": name, "domain": domain})
         flash(f'University "{name}" updated successfully!', 'success')
         return redirect(url_for('universities'))
     
@@ -145,9 +245,9 @@ def edit_university(university_id):
 
 @app.route('/universities/<university_id>/delete', methods=['POST'])
 def delete_university(university_id):
-    doc = db.collection("universities").document(university_id).get()
-    if doc.exists:
-        doc.reference.delete()
+    if universities_repo.get(university_id):
+        universities_repo.delete(university_id)
+        invalidate_caches('stats')
         flash('University deleted successfully!', 'success')
     else:
         flash('University not found', 'error')
@@ -156,17 +256,11 @@ def delete_university(university_id):
 # ── Club routes
 @app.route('/clubs')
 def clubs():
-    docs = list(db.collection("clubs").order_by("name").stream())
-    clubs_data = []
-    
-    for doc in docs:
-        club_data = doc_to_dict_with_id(doc)
-        # Get university name
-        uni_doc = db.collection("universities").document(club_data['universityId']).get()
-        club_data['universityName'] = uni_doc.to_dict().get('name', 'Unknown') if uni_doc.exists else 'Unknown'
-        clubs_data.append(club_data)
+    page, clubs_data = page_from_request(clubs_repo)
+    # Names come from the universities cache; only unknown ids cost a batched read
+    universities_repo.attach_names(clubs_data)
     
-    return render_template('clubs.html', clubs=clubs_data)
+    return render_template('clubs.html', clubs=clubs_data, page=page)
 
 @app.route('/clubs/create', methods=['GET', 'POST'])
 def create_club():
@@ -177,21 +271,19 @@ def create_club():
         
         if not name or not university_id:
             flash('Club name and university are required', 'error')
-            universities_data = [doc_to_dict_with_id(doc) for doc in db.collection("universities").order_by("name").stream()]
-            return render_template('create_club.html', universities=universities_data)
+            return render_template('create_club.html', universities=get_universities())
         
-        ref = db.collection("clubs").document()
-        ref.set(asdict(Club(name=name, universityId=university_id, description=description)))
+        clubs_repo.add(Club(name=name, universityId=university_id, description=description))
+        invalidate_caches('stats')
         flash(f'Club "{name}" created successfully!', 'success')
         return redirect(url_for('clubs'))
     
-    universities_data = [doc_to_dict_with_id(doc) for doc in db.collection("universities").order_by("name").stream()]
-    return render_template('create_club.html', universities=universities_data)
+    return render_template('create_club.html', universities=get_universities())
 
 @app.route('/clubs/<club_id>/edit', methods=['GET', 'POST'])
 def edit_club(club_id):
-    doc = db.collection("clubs").document(club_id).get()
-    if not doc.exists:
+    doc = clubs_repo.get(club_id)
+    if not doc:
         flash('Club not found', 'error')
         return redirect(url_for('clubs'))
     
@@ -203,7 +295,7 @@ def edit_club(club_id):
             flash('Club name is required', 'error')
             return render_template('edit_club.html', club=doc_to_dict_with_id(doc))
         
-        doc.reference.update({"name": name, "description": description})
+        clubs_repo.update(club_id, {"name": name, "description": description})
         flash(f'Club "{name}" updated successfully!', 'success')
         return redirect(url_for('clubs'))
     
@@ -211,15 +303,9 @@ def edit_club(club_id):
 
 @app.route('/clubs/<club_id>/delete', methods=['POST'])
 def delete_club(club_id):
-    doc = db.collection("clubs").document(club_id).get()
-    if doc.exists:
-        # Delete memberships first
-        mem_docs = list(doc.reference.collection("memberships").stream())
-        batch = db.batch()
-        for mem_doc in mem_docs:
-            batch.delete(mem_doc.reference)
-        batch.delete(doc.reference)
-        batch.commit()
+    if clubs_repo.get(club_id):
+        clubs_repo.delete(club_id)
+        invalidate_caches('stats')
         flash('Club and its memberships deleted successfully!', 'success')
     else:
         flash('Club not found', 'error')
@@ -228,9 +314,8 @@ def delete_club(club_id):
 # ── People routes
 @app.route('/people')
 def people():
-    docs = list(db.collection("people").order_by("name").stream())
-    people_data = [doc_to_dict_with_id(doc) for doc in docs]
-    return render_template('people.html', people=people_data)
+    page, people_data = page_from_request(people_repo)
+    return render_template('people.html', people=people_data, page=page)
 
 @app.route('/people/create', methods=['GET', 'POST'])
 def create_person():
@@ -243,17 +328,30 @@ def create_person():
             flash('Person name is required', 'error')
             return render_template('create_person.html')
         
-        ref = db.collection("people").document()
-        ref.set(asdict(Person(name=name, email=email, studentId=student_id)))
+        try:
+            people_repo.add(Person(name=name, email=email, studentId=student_id))
+        except DuplicateValue as exc:
+            flash(f'Could not create person: {exc}', 'error')
+            return render_template('create_person.html')
+        invalidate_caches('stats')
         flash(f'Person "{name}" created successfully!', 'success')
         return redirect(url_for('people'))
     
     return render_template('create_person.html')
 
+@app.route('/people/<person_id>')
+def person_detail(person_id):
+    doc, memberships = run_all(lambda: people_repo.get(person_id), lambda: memberships_repo.for_person(person_id))
+    if not doc:
+        flash('Person not found', 'error')
+        return redirect(url_for('people'))
+    
+    return render_template('person_detail.html', person=doc_to_dict_with_id(doc), memberships=memberships)
+
 @app.route('/people/<person_id>/edit', methods=['GET', 'POST'])
 def edit_person(person_id):
-    doc = db.collection("people").document(person_id).get()
-    if not doc.exists:
+    doc = people_repo.get(person_id)
+    if not doc:
         flash('Person not found', 'error')
         return redirect(url_for('people'))
     
@@ -266,7 +364,11 @@ def edit_person(person_id):
             flash('Person name is required', 'error')
             return render_template('edit_person.html', person=doc_to_dict_with_id(doc))
         
-        doc.reference.update({"name": name, "email": email, "studentId": student_id})
+        try:
+            people_repo.update(person_id, {"name": name, "email": email, "studentId": student_id})
+        except DuplicateValue as exc:
+            flash(f'Could not update person: {exc}', 'error')
+            return render_template('edit_person.html', person=doc_to_dict_with_id(doc))
         flash(f'Person "{name}" updated successfully!', 'success')
         return redirect(url_for('people'))
     
@@ -274,39 +376,50 @@ def edit_person(person_id):
 
 @app.route('/people/<person_id>/delete', methods=['POST'])
 def delete_person(person_id):
-    doc = db.collection("people").document(person_id).get()
-    if doc.exists:
-        doc.reference.delete()
-        flash('Person deleted successfully!', 'success')
+    if people_repo.get(person_id):
+        removed = people_repo.delete(person_id)
+        invalidate_caches('stats')
+        flash(f'Person and {removed} membership(s) deleted successfully!', 'success')
     else:
         flash('Person not found', 'error')
     return redirect(url_for('people'))
 
+@app.route('/api/people/search')
+def api_search_people():
+    query = request.args.get('q', '').strip()
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        limit = 10
+    return jsonify({"results": people_repo.search(query, limit=limit)})
+
+@app.route('/api/people/<person_id>/clubs')
+def api_person_clubs(person_id):
+    doc, memberships = run_all(lambda: people_repo.get(person_id), lambda: memberships_repo.for_person(person_id))
+    if not doc:
+        return jsonify({"error": "Person not found"}), 404
+    for membership in memberships:
+        if isinstance(membership.get('createdAt'), datetime):
+            membership['createdAt'] = membership['createdAt'].isoformat()
+    return jsonify({"personId": person_id, "clubs": memberships})
+
 # ── Membership routes
 @app.route('/clubs/<club_id>/members')
 def club_members(club_id):
-    club_doc = db.collection("clubs").document(club_id).get()
-    if not club_doc.exists:
+    # The roster does not depend on the club document, so both are read at once
+    club_doc, members_data = run_all(lambda: clubs_repo.get(club_id), lambda: memberships_repo.roster(club_id))
+    if not club_doc:
         flash('Club not found', 'error')
         return redirect(url_for('clubs'))
     
     club_data = doc_to_dict_with_id(club_doc)
-    mem_docs = list(club_doc.reference.collection("memberships").stream())
-    
-    members_data = []
-    for mem_doc in mem_docs:
-        mem_data = doc_to_dict_with_id(mem_doc)
-        person_doc = db.collection("people").document(mem_data['personId']).get()
-        mem_data['personName'] = person_doc.to_dict().get('name', 'Unknown') if person_doc.exists else 'Unknown'
-        mem_data['personEmail'] = person_doc.to_dict().get('email', '') if person_doc.exists else ''
-        members_data.append(mem_data)
-    
+    g.firestore_budget = roster_budget(members_data)
     return render_template('club_members.html', club=club_data, members=members_data)
 
 @app.route('/clubs/<club_id>/members/add', methods=['GET', 'POST'])
 def add_member(club_id):
-    club_doc = db.collection("clubs").document(club_id).get()
-    if not club_doc.exists:
+    club_doc = clubs_repo.get(club_id)
+    if not club_doc:
         flash('Club not found', 'error')
         return redirect(url_for('clubs'))
     
@@ -318,26 +431,49 @@ def add_member(club_id):
         
         if not person_id:
             flash('Person is required', 'error')
-            people_data = [doc_to_dict_with_id(doc) for doc in db.collection("people").order_by("name").stream()]
-            return render_template('add_member.html', club=doc_to_dict_with_id(club_doc), people=people_data)
+            return render_template('add_member.html', club=doc_to_dict_with_id(club_doc))
         
-        ref = club_doc.reference.collection("memberships").document()
-        ref.set(asdict(Membership(personId=person_id, role=role, status=status, title=title)))
+        memberships_repo.add(club_id, Membership(personId=person_id, role=role, status=status, title=title))
+        invalidate_caches('stats')
         flash('Member added successfully!', 'success')
         return redirect(url_for('club_members', club_id=club_id))
     
-    people_data = [doc_to_dict_with_id(doc) for doc in db.collection("people").order_by("name").stream()]
-    return render_template('add_member.html', club=doc_to_dict_with_id(club_doc), people=people_data)
+    return render_template('add_member.html', club=doc_to_dict_with_id(club_doc))
+
+@app.route('/clubs/<club_id>/members/import', methods=['GET', 'POST'])
+def import_members(club_id):
+    club_doc = clubs_repo.get(club_id)
+    if not club_doc:
+        flash('Club not found', 'error')
+        return redirect(url_for('clubs'))
+    
+    result = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Choose a roster file to import', 'error')
+            return render_template('import_members.html', club=doc_to_dict_with_id(club_doc))
+        
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        try:
+            result = memberships_repo.import_roster(club_id, iter_rows(stream, jsonl=is_jsonl(upload.filename)))
+        except (UnicodeDecodeError, csv.Error) as exc:
+            flash(f'Could not read the roster file: {exc}', 'error')
+            return render_template('import_members.html', club=doc_to_dict_with_id(club_doc))
+        if result.added:
+            invalidate_caches('stats')
+        flash(f'Added {result.added} member(s).', 'success')
+    
+    return render_template('import_members.html', club=doc_to_dict_with_id(club_doc), result=result)
 
 @app.route('/clubs/<club_id>/members/<member_id>/edit', methods=['GET', 'POST'])
 def edit_member(club_id, member_id):
-    club_doc = db.collection("clubs").document(club_id).get()
-    if not club_doc.exists:
+    club_doc, mem_doc = run_all(lambda: clubs_repo.get(club_id), lambda: memberships_repo.get(club_id, member_id))
+    if not club_doc:
         flash('Club not found', 'error')
         return redirect(url_for('clubs'))
     
-    mem_doc = club_doc.reference.collection("memberships").document(member_id).get()
-    if not mem_doc.exists:
+    if not mem_doc:
         flash('Member not found', 'error')
         return redirect(url_for('club_members', club_id=club_id))
     
@@ -346,23 +482,22 @@ def edit_member(club_id, member_id):
         status = request.form['status'] or 'active'
         title = request.form['title'].strip() or None
         
-        mem_doc.reference.update({"role": role, "status": status, "title": title})
+        memberships_repo.update(club_id, member_id, {"role": role, "status": status, "title": title})
+        invalidate_caches('stats')
         flash('Member updated successfully!', 'success')
         return redirect(url_for('club_members', club_id=club_id))
     
     member_data = doc_to_dict_with_id(mem_doc)
-    person_doc = db.collection("people").document(member_data['personId']).get()
-    member_data['personName'] = person_doc.to_dict().get('name', 'Unknown') if person_doc.exists else 'Unknown'
+    person_doc = people_repo.get(member_data['personId'], fields=('name',))
+    member_data['personName'] = person_doc.to_dict().get('name', 'Unknown') if person_doc else 'Unknown'
     
     return render_template('edit_member.html', club=doc_to_dict_with_id(club_doc), member=member_data)
 
 @app.route('/clubs/<club_id>/members/<member_id>/delete', methods=['POST'])
 def delete_member(club_id, member_id):
-    club_doc = db.collection("clubs").document(club_id).get()
-    if club_doc.exists:
-        mem_doc = club_doc.reference.collection("memberships").document(member_id).get()
-        if mem_doc.exists:
-            mem_doc.reference.delete()
+    if clubs_repo.get(club_id):
+        if memberships_repo.delete(club_id, member_id):
+            invalidate_caches('stats')
             flash('Member removed successfully!', 'success')
         else:
             flash('Member not found', 'error')
@@ -370,5 +505,60 @@ def delete_member(club_id, member_id):
         flash('Club not found', 'error')
     return redirect(url_for('club_members', club_id=club_id))
 
+# ── Exports
+@app.route('/export/<name>.<fmt>')
+def export_collection(name, fmt):
+    # Rows are written as Firestore pages arrive, so memory stays flat however large the export
+    try:
+        lines = export_lines(db, name, fmt)
+    except KeyError:
+        return jsonify({"error": f"Unknown export {name}.{fmt}"}), 404
+    return Response(lines, content_type=f"{FORMATS[fmt]}; charset=utf-8",
+                    headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'})
+
+# ── Async views
+# With FIRESTORE_ASYNC=true (needs flask[async]) these replace the sync views of
+# the same endpoints; their independent reads run concurrently on the AsyncClient.
+async def club_members_async(club_id):
+    club_doc, members_data = await on_client_loop(aio.club_with_roster(async_db(), club_id))
+    if not club_doc:
+        flash('Club not found', 'error')
+        return redirect(url_for('clubs'))
+    g.firestore_budget = roster_budget(members_data)
+    return render_template('club_members.html', club=doc_to_dict_with_id(club_doc), members=members_data)
+
+async def person_detail_async(person_id):
+    doc, memberships = await on_client_loop(aio.person_with_clubs(async_db(), person_id))
+    if not doc:
+        flash('Person not found', 'error')
+        return redirect(url_for('people'))
+    return render_template('person_detail.html', person=doc_to_dict_with_id(doc), memberships=memberships)
+
+async def api_person_clubs_async(person_id):
+    doc, memberships = await on_client_loop(aio.person_with_clubs(async_db(), person_id))
+    if not doc:
+        return jsonify({"error": "Person not found"}), 404
+    for membership in memberships:
+        if isinstance(membership.get('createdAt'), datetime):
+            membership['createdAt'] = membership['createdAt'].isoformat()
+    return jsonify({"personId": person_id, "clubs": memberships})
+
+if os.getenv('FIRESTORE_ASYNC', '').lower() in ('1', 'true', 'yes'):
+    app.view_functions['club_members'] = club_members_async
+    app.view_functions['person_detail'] = person_detail_async
+    app.view_functions['api_person_clubs'] = api_person_clubs_async
+
+# ── Diagnostics
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify({
+        **{name: cache.stats() for name, cache in CACHES.items()},
+        "replicas": {name: replica.stats() for name, replica in replicas.items()},
+    })
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
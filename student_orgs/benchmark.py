@@ -0,0 +1,422 @@
+"""Route benchmarks for the Flask app against a seeded in-memory dataset.
+
+Seeds the in-memory Firestore backend with configurable volumes, drives every
+route in app.py through the Flask test client and reports, per route, latency
+percentiles, Firestore calls/reads/writes per request and peak Python memory.
+Results are written as JSON; pass an earlier result as --baseline to flag
+routes whose reads per request or median latency regressed.
+
+    python benchmark.py --output bench.json
+    python benchmark.py --preset large --baseline bench.json
+"""
+from __future__ import annotations
+import argparse
+import io
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+# The benchmark only ever runs against the in-process backend
+os.environ["FIRESTORE_BACKEND"] = "memory"
+
+from data.memory import MAX_WRITES_PER_COMMIT  # noqa: E402
+from data.models import Club, Membership, Person, University  # noqa: E402
+from data.search import with_search_keys  # noqa: E402
+from data.uniqueness import lookup_ref, unique_keys  # noqa: E402
+
+PRESETS = {
+    "small": {"universities": 10, "clubs": 200, "people": 2_000, "memberships": 10_000},
+    "large": {"universities": 50, "clubs": 5_000, "people": 100_000, "memberships": 500_000},
+}
+# A reads-per-request increase, or a median latency this much slower, counts as a regression
+DEFAULT_LATENCY_TOLERANCE = 0.25
+
+_ID_ALPHABET = string.ascii_letters + string.digits
+_FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn",
+                "Dana", "Emery", "Harper", "Kai", "Logan", "Noah", "Maya", "Priya", "Chen", "Sofia"]
+_LAST_NAMES = ["Garcia", "Nguyen", "Smith", "Patel", "Kim", "Lopez", "Johnson", "Brown", "Davis", "Martinez",
+               "Wilson", "Anderson", "Thomas", "Moore", "Lee", "Hernandez", "Clark", "Lewis", "Young", "Hall"]
+
+@dataclass
+class Volumes:
+    universities: int
+    clubs: int
+    people: int
+    memberships: int
+
+@dataclass
+class Dataset:
+    """Ids of the seeded documents, used to build route URLs"""
+    university_ids: List[str]
+    club_ids: List[str]
+    person_ids: List[str]
+    # (club id, membership id) pairs
+    membership_keys: List[Tuple[str, str]]
+
+# ── seeding
+def _doc_id(rng: random.Random) -> str:
+    return "".join(rng.choice(_ID_ALPHABET) for _ in range(20))
+
+class _BatchWriter:
+    """Accumulates set() calls into full batches"""
+
+    def __init__(self, db):
+        self.db = db
+        self.batch = db.batch()
+
+    def set(self, ref, data: Dict) -> None:
+        self.batch.set(ref, data)
+        if len(self.batch) >= MAX_WRITES_PER_COMMIT:
+            self.flush()
+
+    def flush(self) -> None:
+        if len(self.batch):
+            self.batch.commit()
+            self.batch = self.db.batch()
+
+def seed(db, volumes: Volumes, rng: random.Random) -> Dataset:
+    """Write a synthetic dataset with consistent member counts; returns its ids"""
+    writer = _BatchWriter(db)
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    university_ids = [_doc_id(rng) for _ in range(volumes.universities)]
+    for index, uid in enumerate(university_ids):
+        record = University(name=f"University {index:04d}", domain=f"u{index}.edu", createdAt=created)
+        writer.set(db.collection("universities").document(uid), asdict(record))
+
+    person_ids = [_doc_id(rng) for _ in range(volumes.people)]
+    for index, pid in enumerate(person_ids):
+        first, last = rng.choice(_FIRST_NAMES), rng.choice(_LAST_NAMES)
+        record = Person(name=f"{first} {last}", email=f"{first}.{last}{index}@example.edu".lower(),
+                        studentId=f"{1000000000 + index}", createdAt=created)
+        writer.set(db.collection("people").document(pid), with_search_keys(asdict(record)))
+        for name, key in unique_keys(asdict(record)).items():
+            writer.set(lookup_ref(db, name, key), {"personId": pid})
+
+    club_ids = [_doc_id(rng) for _ in range(volumes.clubs)]
+    members_by_club: Dict[str, List[Dict]] = {cid: [] for cid in club_ids}
+    membership_keys: List[Tuple[str, str]] = []
+    if club_ids and person_ids:
+        for _ in range(volumes.memberships):
+            club_id = rng.choice(club_ids)
+            record = Membership(
+                personId=rng.choice(person_ids),
+                role=rng.choices(["member", "officer", "owner"], weights=[90, 8, 2])[0],
+                status=rng.choices(["active", "inactive"], weights=[85, 15])[0],
+                createdAt=created,
+            )
+            members_by_club[club_id].append(asdict(record))
+
+    for index, cid in enumerate(club_ids):
+        members = members_by_club[cid]
+        record = Club(
+            name=f"Club {index:05d}",
+            universityId=rng.choice(university_ids) if university_ids else "",
+            description="Seeded by benchmark.py",
+            memberCount=len(members),
+            activeMemberCount=sum(1 for m in members if m["status"] == "active"),
+            createdAt=created,
+        )
+        club_ref = db.collection("clubs").document(cid)
+        writer.set(club_ref, asdict(record))
+        for data in members:
+            mid = _doc_id(rng)
+            writer.set(club_ref.collection("memberships").document(mid), data)
+            membership_keys.append((cid, mid))
+    writer.flush()
+    return Dataset(university_ids, club_ids, person_ids, membership_keys)
+
+# ── route cases
+# A case's prepare() builds the request for one iteration and may create the
+# documents it needs; its Firestore operations are not attributed to the route.
+Request = Tuple[str, str, Optional[Dict]]  # (method, path, form data)
+
+@dataclass
+class Case:
+    name: str
+    rule: str
+    prepare: Callable[[int], Request]
+
+def build_cases(app_module, data: Dataset, rng: random.Random) -> List[Case]:
+    universities_repo = app_module.universities_repo
+    clubs_repo = app_module.clubs_repo
+    people_repo = app_module.people_repo
+    memberships_repo = app_module.memberships_repo
+    roster_size = max(1, len(data.membership_keys) // max(1, len(data.club_ids)))
+
+    def pick(ids):
+        return rng.choice(ids)
+
+    def new_university(_):
+        return universities_repo.add(University(name=f"Bench University {_doc_id(rng)}")).id
+
+    def new_club(_):
+        return clubs_repo.add(Club(name=f"Bench Club {_doc_id(rng)}", universityId=pick(data.university_ids))).id
+
+    def new_person(_):
+        return people_repo.add(Person(name=f"Bench Person {_doc_id(rng)}")).id
+
+    def club_with_roster(i):
+        club_id = new_club(i)
+        for _ in range(roster_size):
+            memberships_repo.add(club_id, Membership(personId=pick(data.person_ids)))
+        return club_id
+
+    def person_with_clubs(i):
+        person_id = new_person(i)
+        for _ in range(3):
+            memberships_repo.add(pick(data.club_ids), Membership(personId=person_id))
+        return person_id
+
+    def new_membership(_):
+        club_id = pick(data.club_ids)
+        return club_id, memberships_repo.add(club_id, Membership(personId=pick(data.person_ids))).id
+
+    def roster_upload(_):
+        # Seeded people have studentId 1000000000 + their index
+        picks = rng.sample(range(len(data.person_ids)), min(roster_size, len(data.person_ids)))
+        lines = ["studentId,role,status"] + [f"{1000000000 + index},member,active" for index in picks]
+        return {"file": (io.BytesIO("\n".join(lines).encode()), "roster.csv")}
+
+    def search_term(_):
+        return rng.choice(_FIRST_NAMES)[:rng.randint(1, 3)].lower()
+
+    def get(path_fn):
+        return lambda i: ("GET", path_fn(i), None)
+
+    def post(path_fn, form_fn):
+        return lambda i: ("POST", path_fn(i), form_fn(i))
+
+    def member_path(suffix):
+        def path(i):
+            club_id, member_id = new_membership(i)
+            return f"/clubs/{club_id}/members/{member_id}{suffix}"
+        return path
+
+    return [
+        Case("index", "/", get(lambda i: "/")),
+        Case("universities", "/universities", get(lambda i: "/universities")),
+        Case("create_university_form", "/universities/create", get(lambda i: "/universities/create")),
+        Case("create_university", "/universities/create",
+             post(lambda i: "/universities/create", lambda i: {"name": f"Bench U {i}", "domain": ""})),
+        Case("edit_university_form", "/universities/<university_id>/edit",
+             get(lambda i: f"/universities/{pick(data.university_ids)}/edit")),
+        Case("edit_university", "/universities/<university_id>/edit",
+             post(lambda i: f"/universities/{new_university(i)}/edit",
+                  lambda i: {"name": f"Renamed U {i}", "domain": ""})),
+        Case("delete_university", "/universities/<university_id>/delete",
+             post(lambda i: f"/universities/{new_university(i)}/delete", lambda i: {})),
+        Case("clubs", "/clubs", get(lambda i: "/clubs")),
+        Case("create_club_form", "/clubs/create", get(lambda i: "/clubs/create")),
+        Case("create_club", "/clubs/create",
+             post(lambda i: "/clubs/create",
+                  lambda i: {"name": f"Bench Club {i}", "universityId": pick(data.university_ids),
+                             "description": ""})),
+        Case("edit_club_form", "/clubs/<club_id>/edit", get(lambda i: f"/clubs/{pick(data.club_ids)}/edit")),
+        Case("edit_club", "/clubs/<club_id>/edit",
+             post(lambda i: f"/clubs/{new_club(i)}/edit", lambda i: {"name": f"Renamed Club {i}", "description": ""})),
+        Case("delete_club", "/clubs/<club_id>/delete",
+             post(lambda i: f"/clubs/{club_with_roster(i)}/delete", lambda i: {})),
+        Case("people", "/people", get(lambda i: "/people")),
+        Case("create_person_form", "/people/create", get(lambda i: "/people/create")),
+        Case("create_person", "/people/create",
+             post(lambda i: "/people/create",
+                  lambda i: {"name": f"Bench Person {i}", "email": f"bench{i}@example.edu", "studentId": ""})),
+        Case("person_detail", "/people/<person_id>", get(lambda i: f"/people/{pick(data.person_ids)}")),
+        Case("edit_person_form", "/people/<person_id>/edit", get(lambda i: f"/people/{pick(data.person_ids)}/edit")),
+        Case("edit_person", "/people/<person_id>/edit",
+             post(lambda i: f"/people/{new_person(i)}/edit",
+                  lambda i: {"name": f"Renamed Person {i}", "email": "", "studentId": ""})),
+        Case("delete_person", "/people/<person_id>/delete",
+             post(lambda i: f"/people/{person_with_clubs(i)}/delete", lambda i: {})),
+        Case("api_search_people", "/api/people/search",
+             get(lambda i: f"/api/people/search?q={search_term(i)}&limit=10")),
+        Case("api_person_clubs", "/api/people/<person_id>/clubs",
+             get(lambda i: f"/api/people/{pick(data.person_ids)}/clubs")),
+        Case("club_members", "/clubs/<club_id>/members", get(lambda i: f"/clubs/{pick(data.club_ids)}/members")),
+        Case("add_member_form", "/clubs/<club_id>/members/add",
+             get(lambda i: f"/clubs/{pick(data.club_ids)}/members/add")),
+        Case("add_member", "/clubs/<club_id>/members/add",
+             post(lambda i: f"/clubs/{pick(data.club_ids)}/members/add",
+                  lambda i: {"personId": pick(data.person_ids), "role": "member", "status": "active", "title": ""})),
+        Case("import_members_form", "/clubs/<club_id>/members/import",
+             get(lambda i: f"/clubs/{pick(data.club_ids)}/members/import")),
+        Case("import_members", "/clubs/<club_id>/members/import",
+             post(lambda i: f"/clubs/{pick(data.club_ids)}/members/import", roster_upload)),
+        Case("edit_member_form", "/clubs/<club_id>/members/<member_id>/edit", get(member_path("/edit"))),
+        Case("edit_member", "/clubs/<club_id>/members/<member_id>/edit",
+             post(member_path("/edit"), lambda i: {"role": "officer", "status": "active", "title": "Treasurer"})),
+        Case("delete_member", "/clubs/<club_id>/members/<member_id>/delete",
+             post(member_path("/delete"), lambda i: {})),
+        Case("export_collection", "/export/<name>.<fmt>",
+             get(lambda i: f"/export/{rng.choice(['universities', 'clubs', 'people', 'memberships'])}."
+                           f"{rng.choice(['csv', 'jsonl'])}")),
+        Case("cache_stats", "/api/cache/stats", get(lambda i: "/api/cache/stats")),
+        Case("metrics", "/metrics", get(lambda i: "/metrics")),
+    ]
+
+# ── measurement
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `samples` (which must be non-empty)"""
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+def _reset_caches(app_module) -> None:
+    app_module.universities_cache.invalidate()
+    app_module.stats_cache.invalidate()
+
+def run_case(app_module, client, case: Case, iterations: int, cold: bool) -> Dict:
+    db = app_module.db
+    latencies: List[float] = []
+    totals = {"calls": 0, "reads": 0, "writes": 0}
+    statuses: Dict[str, int] = {}
+
+    def one_request(i: int) -> Tuple[float, int]:
+        """Send one request; returns its latency and, when tracing, its peak allocation"""
+        method, path, form = case.prepare(i)
+        if cold:
+            _reset_caches(app_module)
+        db.reset_counts()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        response = client.open(path, method=method, data=form)
+        # Streamed responses (the exports) only do their work as the body is read
+        response.get_data()
+        response.close()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] - before if tracing else 0
+        for key, value in db.counts().items():
+            totals[key] += value
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+        return elapsed, peak
+
+    # One untimed warm-up so lazy template compilation is not charged to the route
+    method, path, form = case.prepare(-1)
+    client.open(path, method=method, data=form).close()
+    db.reset_counts()
+
+    for i in range(iterations):
+        latencies.append(one_request(i)[0])
+
+    # Peak memory is sampled on a separate request; tracing would skew the latencies
+    tracemalloc.start()
+    try:
+        peak_memory = one_request(iterations)[1]
+    finally:
+        tracemalloc.stop()
+
+    samples = iterations + 1
+    return {
+        "rule": case.rule,
+        "iterations": iterations,
+        "status": statuses,
+        "latencyMs": {
+            "mean": statistics.fmean(latencies) * 1000,
+            "p50": percentile(latencies, 50) * 1000,
+            "p90": percentile(latencies, 90) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies) * 1000,
+        },
+        "firestorePerRequest": {key: value / samples for key, value in totals.items()},
+        "peakMemoryBytes": peak_memory,
+    }
+
+def compare(results: Dict, baseline: Dict, latency_tolerance: float) -> List[str]:
+    """Human-readable regressions of `results` against an earlier run"""
+    problems = []
+    for name, current in results["routes"].items():
+        previous = baseline.get("routes", {}).get(name)
+        if not previous:
+            continue
+        reads, before_reads = current["firestorePerRequest"]["reads"], previous["firestorePerRequest"]["reads"]
+        if reads > before_reads:
+            problems.append(f"{name}: reads/request {before_reads:.1f} -> {reads:.1f}")
+        p50, before_p50 = current["latencyMs"]["p50"], previous["latencyMs"]["p50"]
+        if before_p50 and p50 > before_p50 * (1 + latency_tolerance):
+            problems.append(f"{name}: p50 {before_p50:.2f}ms -> {p50:.2f}ms")
+    return problems
+
+def uncovered_rules(app_module, cases: List[Case]) -> List[str]:
+    covered = {case.rule for case in cases}
+    return sorted(rule.rule for rule in app_module.app.url_map.iter_rules()
+                  if rule.endpoint != "static" and rule.rule not in covered)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    for field in ("universities", "clubs", "people", "memberships"):
+        parser.add_argument(f"--{field}", type=int, help=f"number of {field} to seed (overrides the preset)")
+    parser.add_argument("--iterations", type=int, default=20, help="timed requests per route")
+    parser.add_argument("--routes", help="comma-separated case names to run (default: all)")
+    parser.add_argument("--cold", action="store_true", help="clear the app's caches before every request")
+    parser.add_argument("--seed", type=int, default=3311, help="random seed for the dataset and requests")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON results to check for regressions")
+    parser.add_argument("--latency-tolerance", type=float, default=DEFAULT_LATENCY_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    volumes = Volumes(**{field: getattr(args, field) if getattr(args, field) is not None else value
+                         for field, value in PRESETS[args.preset].items()})
+    rng = random.Random(args.seed)
+
+    import app as app_module
+    app_module.app.config.update(TESTING=True)
+    # Per-request op logging would drown the progress output; budget overruns still show
+    app_module.app.logger.setLevel("WARNING")
+    client = app_module.app.test_client()
+
+    started = time.perf_counter()
+    data = seed(app_module.db, volumes, rng)
+    seed_seconds = time.perf_counter() - started
+    print(f"Seeded {volumes} in {seed_seconds:.1f}s", file=sys.stderr)
+
+    cases = build_cases(app_module, data, rng)
+    if args.routes:
+        wanted = {name.strip() for name in args.routes.split(",")}
+        cases = [case for case in cases if case.name in wanted]
+
+    routes = {}
+    for case in cases:
+        routes[case.name] = run_case(app_module, client, case, args.iterations, args.cold)
+        print(f"  {case.name:<24} p50 {routes[case.name]['latencyMs']['p50']:8.2f}ms  "
+              f"reads {routes[case.name]['firestorePerRequest']['reads']:8.1f}", file=sys.stderr)
+
+    results = {
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "volumes": asdict(volumes),
+        "iterations": args.iterations,
+        "cold": args.cold,
+        "seedSeconds": seed_seconds,
+        "uncoveredRoutes": uncovered_rules(app_module, cases) if not args.routes else [],
+        "routes": routes,
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            problems = compare(results, json.load(fh), args.latency_tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
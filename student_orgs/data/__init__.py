@@ -0,0 +1,21 @@
+"""Shared Firestore data-access layer for the Flask app and the CLI.
+
+The models and repos are imported on first access, so importing a light
+module such as data.client does not pull in the Firestore libraries.
+"""
+from importlib import import_module
+
+_EXPORTS = {
+    "University": "data.models", "Club": "data.models", "Person": "data.models", "Membership": "data.models",
+    "UniversityRepo": "data.repos", "ClubRepo": "data.repos", "PersonRepo": "data.repos",
+    "MembershipRepo": "data.repos",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'data' has no attribute '{name}'")
+    value = getattr(import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,72 @@
+"""Async read path on the Firestore AsyncClient, for async Flask views.
+
+Reads that do not depend on each other are issued together with
+asyncio.gather, so a page waits for its slowest query rather than for the sum
+of them. Rows come out in the same shape as the synchronous joins in
+data.roster, so templates work with either path.
+"""
+from __future__ import annotations
+import asyncio
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from data.lookups import GET_ALL_CHUNK_SIZE, chunked
+from data.roster import (
+    MEMBERSHIP_FIELDS, ROSTER_PERSON_FIELDS, attach_club_names, attach_people, person_club_rows,
+    person_memberships_query, roster_rows,
+)
+
+async def get_doc(db, collection: str, doc_id: str, field_paths: Optional[Sequence[str]] = None):
+    """Snapshot of one document, or None when it does not exist"""
+    if not doc_id:
+        return None
+    mask = list(field_paths) if field_paths is not None else None
+    snap = await db.collection(collection).document(doc_id).get(field_paths=mask)
+    return snap if snap.exists else None
+
+async def stream_list(query) -> List:
+    return [snap async for snap in query.stream()]
+
+async def get_docs_by_id(db, collection: str, ids: Iterable[str],
+                         field_paths: Optional[Sequence[str]] = None) -> Dict[str, object]:
+    """Async get_docs_by_id: the get_all chunks run concurrently"""
+    unique_ids = list(dict.fromkeys(i for i in ids if i))
+    col = db.collection(collection)
+    mask = list(field_paths) if field_paths is not None else None
+
+    async def fetch(chunk):
+        return [snap async for snap in db.get_all([col.document(i) for i in chunk], field_paths=mask)]
+
+    found = {}
+    for snaps in await asyncio.gather(*(fetch(chunk) for chunk in chunked(unique_ids, GET_ALL_CHUNK_SIZE))):
+        for snap in snaps:
+            if snap.exists:
+                found[snap.id] = snap
+    return found
+
+async def get_names_by_id(db, collection: str, ids: Iterable[str], field: str = "name") -> Dict[str, str]:
+    docs = await get_docs_by_id(db, collection, ids, field_paths=[field])
+    return {doc_id: (snap.to_dict() or {}).get(field) for doc_id, snap in docs.items()}
+
+async def club_with_roster(db, club_id: str) -> Tuple[Optional[object], List[dict]]:
+    """The club snapshot (or None) and its roster, as join_club_roster returns it
+
+    The club and its memberships are read together; the people lookup follows.
+    """
+    memberships = db.collection("clubs").document(club_id).collection("memberships").select(MEMBERSHIP_FIELDS)
+    club, mem_docs = await asyncio.gather(get_doc(db, "clubs", club_id), stream_list(memberships))
+    if club is None:
+        return None, []
+    rows = roster_rows(mem_docs)
+    people = await get_docs_by_id(db, "people", (row.get('personId') for row in rows),
+                                  field_paths=ROSTER_PERSON_FIELDS)
+    return club, attach_people(rows, people)
+
+async def person_with_clubs(db, person_id: str) -> Tuple[Optional[object], List[dict]]:
+    """The person snapshot (or None) and their memberships, as join_person_clubs returns them"""
+    memberships = person_memberships_query(db, person_id).select(MEMBERSHIP_FIELDS)
+    person, mem_docs = await asyncio.gather(get_doc(db, "people", person_id), stream_list(memberships))
+    if person is None:
+        return None, []
+    rows = person_club_rows(mem_docs)
+    names = await get_names_by_id(db, "clubs", (row['clubId'] for row in rows))
+    return person, attach_club_names(rows, names)
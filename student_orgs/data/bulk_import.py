@@ -0,0 +1,321 @@
+"""Bulk imports from CSV or JSONL files: people, and club rosters.
+
+Rows are streamed from the file, validated against the Person dataclass and
+deduplicated by email and student id, against both earlier rows and stored
+people. Each batch of people, with their email/studentId lookup documents, is
+one commit, and up to `workers` commits run at once. A checkpoint file records how many rows are safely
+written, so an interrupted import resumes where it stopped when run again.
+
+A roster import adds memberships to one club for people named by email or
+student id; see import_roster().
+"""
+from __future__ import annotations
+import csv
+import hashlib
+import json
+import os
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field, fields
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from data import opstats
+from data.cascade import BATCH_WRITE_LIMIT
+from data.counters import count_deltas, count_updates
+from data.fanout import map_ordered
+from data.lookups import chunked
+from data.models import Membership, Person
+from data.search import with_search_keys
+from data.uniqueness import UNIQUE_FIELDS, find_people, lookup_ref, unique_keys
+
+# Parallel batch commits used by bulk imports
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "4"))
+
+# Firestore allows at most 30 values in an `in` filter
+IN_FILTER_LIMIT = 30
+
+# A person and up to one lookup document per unique field
+PEOPLE_PER_BATCH = BATCH_WRITE_LIMIT // (1 + len(UNIQUE_FIELDS))
+
+# Columns of a people file; anything else in a row is ignored
+PERSON_COLUMNS = tuple(f.name for f in fields(Person) if f.name != "createdAt")
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    # (line number, reason) for every rejected row
+    invalid: List[Tuple[int, str]] = field(default_factory=list)
+
+def iter_rows(stream, jsonl: bool = False) -> Iterator[Tuple[int, Dict]]:
+    """(line number, row dict) pairs from an open text stream of CSV or JSONL"""
+    if jsonl:
+        for line_no, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError as exc:
+                    row = {"__error__": f"invalid JSON: {exc}"}
+                yield line_no, row if isinstance(row, dict) else {"__error__": "not a JSON object"}
+    else:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+
+def is_jsonl(filename: str) -> bool:
+    return filename.lower().endswith((".jsonl", ".ndjson"))
+
+def read_rows(path: str) -> Iterator[Tuple[int, Dict]]:
+    """(line number, row dict) pairs from a .csv file or a .jsonl/.ndjson file"""
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        yield from iter_rows(fh, jsonl=is_jsonl(path))
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    return str(value).strip() or None
+
+def person_from_row(row: Dict) -> Person:
+    """Person for an import row; raises ValueError when the row cannot be one"""
+    if "__error__" in row:
+        raise ValueError(row["__error__"])
+    values = {column: _text(row.get(column)) for column in PERSON_COLUMNS}
+    if not values["name"]:
+        raise ValueError("name is required")
+    if values["email"] and "@" not in values["email"]:
+        raise ValueError(f"invalid email '{values['email']}'")
+    return Person(**values)
+
+def _keys_by_field(rows: Iterable[Dict]) -> Dict[str, Set[str]]:
+    keys: Dict[str, Set[str]] = {name: set() for name in UNIQUE_FIELDS}
+    for data in rows:
+        for name, key in unique_keys(data).items():
+            keys[name].add(key)
+    return keys
+
+def doc_id_for(run_id: str, line_no: int) -> str:
+    """Stable document id for a row, so re-committing a batch overwrites rather than duplicates"""
+    return hashlib.sha1(f"{run_id}:{line_no}".encode()).hexdigest()[:20]
+
+# ── checkpoints
+def load_checkpoint(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+def save_checkpoint(path: str, state: Dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, path)
+
+def _commit_people(db, people: List[Tuple[str, Dict]]) -> int:
+    batch = db.batch()
+    collection = db.collection("people")
+    for doc_id, data in people:
+        batch.set(collection.document(doc_id), data)
+        for name, key in unique_keys(data).items():
+            batch.set(lookup_ref(db, name, key), {"personId": doc_id})
+    batch.commit()
+    return len(people)
+
+@dataclass
+class _Chunk:
+    """One batch of rows: its tallies, and the commit writing it (None when nothing to write)"""
+    last_line: int
+    tally: ImportResult
+    future: object = None
+
+    def done(self) -> bool:
+        return self.future is None or self.future.done()
+
+def import_people(db, path: str, workers: int = IMPORT_WORKERS, batch_size: int = PEOPLE_PER_BATCH,
+                  checkpoint_path: Optional[str] = None,
+                  on_progress: Optional[Callable[[ImportResult], None]] = None) -> ImportResult:
+    """Import the people in a CSV/JSONL file; see the module docstring
+
+    Rows with an email or student id already used by a stored person or an
+    earlier row count as duplicates and are skipped. Stored people are found
+    through the lookup documents, so run the lookup backfill first on data
+    written before they existed. Claims are checked before each commit rather
+    than inside it, so avoid editing people while an import runs.
+    `checkpoint_path` defaults to `<path>.checkpoint.json` and is removed once
+    the import completes.
+    """
+    batch_size = max(1, min(batch_size, PEOPLE_PER_BATCH))
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint.json"
+    state = load_checkpoint(checkpoint_path) or {"runId": uuid.uuid4().hex, "line": 0, "result": {}}
+    result = ImportResult(**state["result"])
+    result.invalid = [tuple(entry) for entry in result.invalid]
+    seen: Dict[str, Set[str]] = {name: set() for name in UNIQUE_FIELDS}
+    # Chunks in file order; the checkpoint only moves past a chunk once it and
+    # every chunk before it are committed
+    chunks: List[_Chunk] = []
+
+    def advance() -> None:
+        moved = False
+        while chunks and chunks[0].done():
+            chunk = chunks.pop(0)
+            if chunk.future is not None:
+                chunk.future.result()
+            result.rows += chunk.tally.rows
+            result.imported += chunk.tally.imported
+            result.duplicates += chunk.tally.duplicates
+            result.invalid.extend(chunk.tally.invalid)
+            state["line"] = chunk.last_line
+            moved = True
+        if moved:
+            state["result"] = asdict(result)
+            save_checkpoint(checkpoint_path, state)
+            if on_progress:
+                on_progress(result)
+
+    def flush(rows: List[Tuple[int, Dict]], chunk: _Chunk, pool) -> None:
+        stored = find_people(db, _keys_by_field(data for _, data in rows))
+        people = []
+        for line_no, data in rows:
+            doc_id = doc_id_for(state["runId"], line_no)
+            keys = unique_keys(data)
+            # A value held by this row's own id was written before an interruption
+            if any(stored[name].get(key, doc_id) != doc_id or key in seen[name] for name, key in keys.items()):
+                chunk.tally.duplicates += 1
+                continue
+            for name, key in keys.items():
+                seen[name].add(key)
+            people.append((doc_id, data))
+        chunk.tally.imported = len(people)
+        if people and pool is not None:
+            chunk.future = opstats.submit(pool, _commit_people, db, people)
+        elif people:
+            _commit_people(db, people)
+        chunks.append(chunk)
+
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        rows: List[Tuple[int, Dict]] = []
+        chunk = _Chunk(state["line"], ImportResult())
+        for line_no, row in read_rows(path):
+            if line_no <= state["line"]:
+                continue
+            chunk.last_line = line_no
+            chunk.tally.rows += 1
+            try:
+                rows.append((line_no, with_search_keys(asdict(person_from_row(row)))))
+            except (TypeError, ValueError) as exc:
+                chunk.tally.invalid.append((line_no, str(exc)))
+            if len(rows) >= batch_size:
+                flush(rows, chunk, pool)
+                rows, chunk = [], _Chunk(line_no, ImportResult())
+                pending = [c.future for c in chunks if not c.done()]
+                if len(pending) >= workers:
+                    wait(pending, return_when=FIRST_COMPLETED)
+                advance()
+        if chunk.tally.rows:
+            flush(rows, chunk, pool)
+        for pending in chunks:
+            if pending.future is not None:
+                pending.future.result()
+        advance()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return result
+
+# ── club rosters
+ROLES = ("owner", "officer", "member")
+STATUSES = ("active", "inactive")
+
+@dataclass
+class RosterImportResult:
+    rows: int = 0
+    added: int = 0
+    # (line number, person id) of rows naming someone already in the club
+    duplicates: List[Tuple[int, str]] = field(default_factory=list)
+    # (line number, email or student id) of rows matching no stored person
+    unresolved: List[Tuple[int, str]] = field(default_factory=list)
+    invalid: List[Tuple[int, str]] = field(default_factory=list)
+
+def roster_entry_from_row(row: Dict) -> Tuple[Dict[str, str], Dict]:
+    """(normalized person keys, membership fields) for a roster row; raises ValueError when invalid"""
+    if "__error__" in row:
+        raise ValueError(row["__error__"])
+    keys = unique_keys({name: _text(row.get(name)) for name in UNIQUE_FIELDS})
+    if not keys:
+        raise ValueError("email or studentId is required")
+    role = (_text(row.get("role")) or "member").lower()
+    status = (_text(row.get("status")) or "active").lower()
+    if role not in ROLES:
+        raise ValueError(f"role must be one of {', '.join(ROLES)} (got '{role}')")
+    if status not in STATUSES:
+        raise ValueError(f"status must be one of {', '.join(STATUSES)} (got '{status}')")
+    return keys, {"role": role, "status": status, "title": _text(row.get("title"))}
+
+def existing_member_ids(db, club_ref, person_ids: Iterable[str]) -> Set[str]:
+    """Which of `person_ids` already have a membership in the club"""
+    memberships = club_ref.collection("memberships")
+    queries = [memberships.where(filter=FieldFilter("personId", "in", chunk)).select(["personId"])
+               for chunk in chunked(sorted(set(person_ids)), IN_FILTER_LIMIT)]
+    return {(snap.to_dict() or {}).get("personId")
+            for snaps in map_ordered(lambda query: list(query.stream()), queries) for snap in snaps}
+
+def _commit_memberships(db, club_ref, memberships: List[Dict]) -> None:
+    # The club's counts move in the same batch, so they never disagree with the memberships
+    batch = db.batch()
+    deltas: Dict[str, int] = {}
+    collection = club_ref.collection("memberships")
+    for data in memberships:
+        batch.create(collection.document(), data)
+        for name, delta in count_deltas(None, data).items():
+            deltas[name] = deltas.get(name, 0) + delta
+    batch.update(club_ref, count_updates(deltas))
+    batch.commit()
+
+def import_roster(db, club_ref, rows: Iterable[Tuple[int, Dict]],
+                  batch_size: int = BATCH_WRITE_LIMIT - 1) -> RosterImportResult:
+    """Add the people named in roster rows to a club
+
+    Rows name a person by `email` or `studentId` and may set `role`, `status`
+    and `title`. People are resolved through their lookup documents in batched
+    reads; people already in the club, or named twice, are reported
+    as duplicates. Memberships are created in batches that also update the
+    club's member counts.
+    """
+    batch_size = max(1, min(batch_size, BATCH_WRITE_LIMIT - 1))
+    result = RosterImportResult()
+    entries = []
+    for line_no, row in rows:
+        result.rows += 1
+        try:
+            entries.append((line_no,) + roster_entry_from_row(row))
+        except ValueError as exc:
+            result.invalid.append((line_no, str(exc)))
+
+    found = find_people(db, _keys_by_field(keys for _, keys, _ in entries))
+    resolved = []
+    for line_no, keys, details in entries:
+        person_id = next((found[name][key] for name, key in keys.items() if key in found[name]), None)
+        if person_id is None:
+            result.unresolved.append((line_no, next(iter(keys.values()))))
+        else:
+            resolved.append((line_no, person_id, details))
+
+    members = existing_member_ids(db, club_ref, (person_id for _, person_id, _ in resolved))
+    memberships = []
+    for line_no, person_id, details in resolved:
+        if person_id in members:
+            result.duplicates.append((line_no, person_id))
+            continue
+        members.add(person_id)
+        memberships.append(asdict(Membership(personId=person_id, **details)))
+
+    for chunk in chunked(memberships, batch_size):
+        _commit_memberships(db, club_ref, chunk)
+        result.added += len(chunk)
+    return result
@@ -0,0 +1,255 @@
+"""Read-through caches with TTL expiry and hit/miss counters.
+
+CACHE_BACKEND picks where entries live: "local" (default) keeps them in the
+process, which suits a single worker; "redis" shares them between workers
+through the server at REDIS_URL, so one worker's invalidation is seen by all.
+REDIS_URL=memory:// uses LocalRedis, an in-process stand-in for trying it out.
+"""
+from __future__ import annotations
+import io
+import os
+import pickle
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local").strip().lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+class CacheBackend:
+    """Interface shared by the cache implementations"""
+
+    def get(self, key: Hashable, default: Any = None, generation: Optional[int] = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """Store `value`; with `generation`, only if the cache has not been invalidated since"""
+        raise NotImplementedError
+
+    def generation(self) -> int:
+        """Counter that moves on every invalidate()"""
+        raise NotImplementedError
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, or everything when no key is given"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for `key`, calling `loader` to fill it on a miss
+
+        A value loaded while the cache was invalidated is returned but not kept,
+        so a write that lands during the load is never hidden for a whole TTL.
+        """
+        generation = self.generation()
+        sentinel = object()
+        value = self.get(key, sentinel, generation)
+        if value is sentinel:
+            value = loader()
+            self.set(key, value, generation)
+        return value
+
+class TTLCache(CacheBackend):
+    """Small thread-safe cache: entries expire after `ttl_seconds` or on invalidate()"""
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None, generation: Optional[int] = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self.hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                # Evict the oldest insertion so per-page keys cannot grow without bound
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRatio": (self.hits / total) if total else 0.0,
+                "size": len(self._entries),
+            }
+
+# ── shared (Redis) backend
+class CachedSnapshot:
+    """Picklable stand-in for a DocumentSnapshot: id and data only"""
+
+    def __init__(self, doc_id: str, data: Optional[Dict]):
+        self.id = doc_id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict]:
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field_path: str):
+        value = self._data or {}
+        for part in field_path.split("."):
+            value = value[part]
+        return value
+
+class _SnapshotPickler(pickle.Pickler):
+    # Snapshots hold a reference to their client, which cannot be pickled
+    def reducer_override(self, obj):
+        if not isinstance(obj, type) and hasattr(obj, "to_dict") and hasattr(obj, "reference") \
+                and hasattr(obj, "exists"):
+            return CachedSnapshot, (obj.id, obj.to_dict())
+        return NotImplemented
+
+def dumps(value: Any) -> bytes:
+    buffer = io.BytesIO()
+    _SnapshotPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(value)
+    return buffer.getvalue()
+
+class RedisCache(CacheBackend):
+    """Cache whose entries live in Redis, shared by every worker using `namespace`
+
+    Clearing the whole namespace bumps a generation counter that is part of
+    every key, so it is one INCR however many entries there are; the orphaned
+    entries expire on their own. Hit/miss counters are per process.
+    """
+
+    def __init__(self, client, namespace: str, ttl_seconds: float = 300):
+        self.client = client
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self) -> int:
+        return int(self.client.get(f"{self.namespace}:gen") or 0)
+
+    def _key(self, key: Hashable, generation: Optional[int] = None) -> str:
+        if generation is None:
+            generation = self.generation()
+        return f"{self.namespace}:{generation}:{key!r}"
+
+    def get(self, key: Hashable, default: Any = None, generation: Optional[int] = None) -> Any:
+        raw = self.client.get(self._key(key, generation))
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        # Under an older generation the entry is never read again and just expires
+        self.client.set(self._key(key, generation), dumps(value), ex=max(1, int(self.ttl_seconds)))
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self.client.incr(f"{self.namespace}:gen")
+        else:
+            self.client.delete(self._key(key))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRatio": (self.hits / total) if total else 0.0,
+                # Entries are shared between workers and not counted here
+                "size": None,
+            }
+
+class LocalRedis:
+    """In-process stand-in for the redis-py calls RedisCache makes"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._values: Dict[str, Tuple[Optional[float], bytes]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str):
+        entry = self._values.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= self._clock():
+            del self._values[key]
+            return None
+        return entry
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._live(key)
+            return entry[1] if entry else None
+
+    def set(self, key: str, value, ex: Optional[int] = None) -> bool:
+        if not isinstance(value, bytes):
+            value = str(value).encode()
+        with self._lock:
+            self._values[key] = (self._clock() + ex if ex else None, value)
+        return True
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            entry = self._live(key)
+            value = int(entry[1]) + amount if entry else amount
+            self._values[key] = (entry[0] if entry else None, str(value).encode())
+            return value
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(1 for key in keys if self._values.pop(key, None) is not None)
+
+_redis_client = None
+
+def redis_client():
+    """Client for REDIS_URL, shared by every RedisCache in the process"""
+    global _redis_client
+    if _redis_client is None:
+        if REDIS_URL.startswith("memory://"):
+            _redis_client = LocalRedis()
+        else:
+            import redis
+            _redis_client = redis.Redis.from_url(REDIS_URL)
+    return _redis_client
+
+def make_cache(namespace: str, ttl_seconds: float = 300) -> CacheBackend:
+    """A cache on the configured CACHE_BACKEND"""
+    if CACHE_BACKEND == "redis":
+        return RedisCache(redis_client(), f"student_orgs:{namespace}", ttl_seconds)
+    if CACHE_BACKEND != "local":
+        raise ValueError(f"CACHE_BACKEND must be local or redis (got '{CACHE_BACKEND}')")
+    return TTLCache(ttl_seconds=ttl_seconds)
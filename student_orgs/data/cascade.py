@@ -0,0 +1,132 @@
+"""Chunked cascade deletes that stay inside Firestore's batch write limit."""
+from __future__ import annotations
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from data import opstats
+from data.counters import count_deltas, count_updates
+from data.lookups import get_docs_by_id
+from data.roster import person_memberships_query
+
+# Firestore rejects batches with more than 500 writes
+BATCH_WRITE_LIMIT = 500
+
+# Parallel batch commits used when cascading large deletes
+CASCADE_DELETE_WORKERS = int(os.getenv("CASCADE_DELETE_WORKERS", "4"))
+
+def _commit_deletes(db, refs: List) -> int:
+    batch = db.batch()
+    for ref in refs:
+        batch.delete(ref)
+    batch.commit()
+    return len(refs)
+
+def delete_query_in_chunks(db, query, chunk_size: int = BATCH_WRITE_LIMIT, workers: int = 1,
+                           on_progress: Optional[Callable[[int], None]] = None) -> int:
+    """Delete every document matched by `query`, one bounded page and batch at a time
+
+    Only document names are fetched, paging by document id, and each page becomes
+    one batch commit. With `workers` > 1 up to that many commits run in parallel
+    while the next page is read. At most `workers` pages are held in memory.
+    Deletes are idempotent, so an interrupted run is resumed by calling this
+    again with the same query. Returns the number of documents deleted.
+    """
+    chunk_size = max(1, min(chunk_size, BATCH_WRITE_LIMIT))
+    keys_only = query.select([FieldPath.document_id()]).order_by(FieldPath.document_id()).limit(chunk_size)
+    deleted = 0
+    last = None
+
+    def report(count):
+        nonlocal deleted
+        deleted += count
+        if on_progress:
+            on_progress(deleted)
+
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    pending = set()
+    try:
+        while True:
+            page = keys_only.start_after(last) if last is not None else keys_only
+            snaps = list(page.stream())
+            if not snaps:
+                break
+            last = snaps[-1]
+            refs = [snap.reference for snap in snaps]
+            if pool is None:
+                report(_commit_deletes(db, refs))
+            else:
+                pending.add(opstats.submit(pool, _commit_deletes, db, refs))
+                if len(pending) >= workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report(future.result())
+            if len(snaps) < chunk_size:
+                break
+        for future in pending:
+            report(future.result())
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+    return deleted
+
+def delete_person_cascade(db, person_ref, chunk_size: int = BATCH_WRITE_LIMIT // 2) -> int:
+    """Delete a person and all of their memberships; returns the memberships removed
+
+    Each page of memberships is deleted in one batch together with the matching
+    decrements of its clubs' member counts. Clubs that no longer exist are skipped.
+    """
+    query = (
+        person_memberships_query(db, person_ref.id)
+        .select(["status"])
+        .order_by(FieldPath.document_id())
+        .limit(max(1, min(chunk_size, BATCH_WRITE_LIMIT // 2)))
+    )
+    removed = 0
+    last = None
+    while True:
+        page = query.start_after(last) if last is not None else query
+        snaps = list(page.stream())
+        if not snaps:
+            break
+        last = snaps[-1]
+
+        deltas: Dict[str, Dict[str, int]] = {}
+        for snap in snaps:
+            club_deltas = deltas.setdefault(snap.reference.parent.parent.id, {})
+            for field, delta in count_deltas(snap.to_dict(), None).items():
+                club_deltas[field] = club_deltas.get(field, 0) + delta
+        existing = get_docs_by_id(db, "clubs", deltas)
+
+        batch = db.batch()
+        for snap in snaps:
+            batch.delete(snap.reference)
+        for club_id, club_deltas in deltas.items():
+            if club_id in existing:
+                batch.update(existing[club_id].reference, count_updates(club_deltas))
+        batch.commit()
+        removed += len(snaps)
+    person_ref.delete()
+    return removed
+
+def delete_club_cascade(db, club_ref, chunk_size: int = BATCH_WRITE_LIMIT, workers: int = 1,
+                        on_progress: Optional[Callable[[int], None]] = None) -> int:
+    """Delete a club and its memberships subcollection; returns the memberships removed
+
+    The club is flagged `deleting` first and only removed once its memberships are
+    gone, so an interrupted delete can be finished by resume_club_deletes().
+    """
+    club_ref.update({"deleting": True})
+    removed = delete_query_in_chunks(db, club_ref.collection("memberships"), chunk_size, workers, on_progress)
+    club_ref.delete()
+    return removed
+
+def resume_club_deletes(db, chunk_size: int = BATCH_WRITE_LIMIT, workers: int = 1) -> int:
+    """Finish every club delete that was interrupted; returns the number of clubs deleted"""
+    pending = list(db.collection("clubs").where(filter=FieldFilter("deleting", "==", True)).stream())
+    for snap in pending:
+        delete_club_cascade(db, snap.reference, chunk_size, workers)
+    return len(pending)
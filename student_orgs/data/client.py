@@ -0,0 +1,149 @@
+"""Firestore client bootstrap shared by the Flask app and the CLI.
+
+FIRESTORE_BACKEND picks the implementation: "firestore" (default) talks to
+the real project configured in .env, "memory" uses the in-process stand-in
+from data.memory and needs no credentials or network. The client is created on
+first use, not at import, so importing the app or the CLI opens no connection;
+`db` stands in for it until then. The settings are still checked at import, so
+a misconfigured process fails at startup rather than on its first query.
+async_db() returns the matching async client for async views, which run
+their reads on its loop with on_client_loop().
+"""
+from __future__ import annotations
+import asyncio
+import contextvars
+import os
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+from dotenv import load_dotenv
+
+from data.opstats import instrument_async_client, instrument_client
+
+load_dotenv()
+BACKEND = os.getenv("FIRESTORE_BACKEND", "firestore").strip().lower()
+
+class ClientConfigError(RuntimeError):
+    """The environment does not configure a usable Firestore backend"""
+
+def _firestore_settings():
+    """(service account path, project id) from the environment"""
+    sa_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+    project_id = os.getenv("FIREBASE_PROJECT_ID")
+    if not sa_path or not os.path.exists(sa_path):
+        raise ClientConfigError("Set GOOGLE_APPLICATION_CREDENTIALS in .env to your service account JSON path.")
+    if not project_id:
+        raise ClientConfigError("Set FIREBASE_PROJECT_ID in .env to your Firebase project id.")
+    return sa_path, project_id
+
+def _firestore_client():
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    sa_path, project_id = _firestore_settings()
+    cred = credentials.Certificate(sa_path)
+    firebase_admin.initialize_app(cred, {"projectId": project_id})
+    return instrument_client(firestore.client())
+
+def _memory_client():
+    from data.memory import MemoryClient
+    return MemoryClient()
+
+BACKENDS = {
+    "firestore": _firestore_client,
+    "memory": _memory_client,
+}
+
+def check_config() -> None:
+    """Raise ClientConfigError unless the settings BACKEND needs are present; touches no network"""
+    if BACKEND not in BACKENDS:
+        raise ClientConfigError(f"FIRESTORE_BACKEND must be one of {', '.join(BACKENDS)} (got '{BACKEND}').")
+    if BACKEND == "firestore":
+        _firestore_settings()
+
+check_config()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_db():
+    """The Firestore client for BACKEND, created on the first call"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = BACKENDS[BACKEND]()
+    return _client
+
+class LazyClient:
+    """Forwards attribute access to get_db(), so holding it costs nothing until used"""
+
+    def __getattr__(self, name):
+        return getattr(get_db(), name)
+
+    def __repr__(self):
+        return f"<LazyClient {BACKEND} {'ready' if _client is not None else 'not created'}>"
+
+db = LazyClient()
+
+def _firestore_async_client():
+    import firebase_admin
+    from google.cloud import firestore
+
+    # Reuses the credentials of the app initialized for the sync client
+    get_db()
+    app = firebase_admin.get_app()
+    client = firestore.AsyncClient(project=app.project_id, credentials=app.credential.get_credential())
+    return instrument_async_client(client)
+
+def _memory_async_client():
+    from data.memory import AsyncMemoryClient
+    return AsyncMemoryClient(get_db())
+
+ASYNC_BACKENDS = {
+    "firestore": _firestore_async_client,
+    "memory": _memory_async_client,
+}
+
+# gRPC aio channels belong to the event loop that created them, and async Flask
+# views run each request on a fresh loop. One client therefore lives on one
+# background loop for the whole process, and views hand their reads to it.
+_async_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_client = None
+_async_lock = threading.Lock()
+
+T = TypeVar("T")
+
+def _client_loop() -> asyncio.AbstractEventLoop:
+    global _async_loop
+    if _async_loop is None:
+        with _async_lock:
+            if _async_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="firestore-async", daemon=True).start()
+                _async_loop = loop
+    return _async_loop
+
+def async_db():
+    """The process-wide async client; only await it inside on_client_loop()"""
+    global _async_client
+    if _async_client is None:
+        loop = _client_loop()
+        with _async_lock:
+            if _async_client is None:
+                async def create():
+                    return ASYNC_BACKENDS[BACKEND]()
+                _async_client = asyncio.run_coroutine_threadsafe(create(), loop).result()
+    return _async_client
+
+async def _in_context(context, coro: Awaitable[T]) -> T:
+    # Tasks on the client loop start from that thread's context; carry the caller's
+    # over so e.g. opstats still attributes the reads to the request
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+async def on_client_loop(coro: Awaitable[T]) -> T:
+    """Run `coro` on the async client's loop and await its result from any other loop"""
+    future = asyncio.run_coroutine_threadsafe(_in_context(contextvars.copy_context(), coro), _client_loop())
+    return await asyncio.wrap_future(future)
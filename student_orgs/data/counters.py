@@ -0,0 +1,84 @@
+"""Denormalized member counts on club documents, kept in step with memberships."""
+from __future__ import annotations
+from typing import Dict, Optional
+
+from google.cloud.firestore_v1 import Increment, transactional
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+MEMBER_COUNT = "memberCount"
+ACTIVE_MEMBER_COUNT = "activeMemberCount"
+
+def _is_active(data: Optional[Dict]) -> bool:
+    return bool(data) and data.get("status") == "active"
+
+def count_deltas(before: Optional[Dict], after: Optional[Dict]) -> Dict[str, int]:
+    """Counter changes for a membership going from `before` to `after` (None = absent)"""
+    return {
+        MEMBER_COUNT: int(after is not None) - int(before is not None),
+        ACTIVE_MEMBER_COUNT: int(_is_active(after)) - int(_is_active(before)),
+    }
+
+def count_updates(deltas: Dict[str, int]) -> Dict[str, Increment]:
+    """Increment transforms for the non-zero deltas"""
+    return {field: Increment(delta) for field, delta in deltas.items() if delta}
+
+def add_membership(db, club_ref, data: Dict):
+    """Create a membership and bump the club's counts atomically; returns the new ref"""
+    mem_ref = club_ref.collection("memberships").document()
+
+    @transactional
+    def _add(transaction):
+        transaction.create(mem_ref, data)
+        transaction.update(club_ref, count_updates(count_deltas(None, data)))
+
+    _add(db.transaction())
+    return mem_ref
+
+def update_membership(db, club_ref, mem_ref, updates: Dict) -> bool:
+    """Apply `updates` to a membership, adjusting the active count if status changes"""
+
+    @transactional
+    def _update(transaction):
+        snap = mem_ref.get(transaction=transaction)
+        if not snap.exists:
+            return False
+        before = snap.to_dict()
+        transaction.update(mem_ref, updates)
+        counts = count_updates(count_deltas(before, {**before, **updates}))
+        if counts:
+            transaction.update(club_ref, counts)
+        return True
+
+    return _update(db.transaction())
+
+def delete_membership(db, club_ref, mem_ref) -> bool:
+    """Delete a membership and decrement the club's counts atomically"""
+
+    @transactional
+    def _delete(transaction):
+        snap = mem_ref.get(transaction=transaction)
+        if not snap.exists:
+            return False
+        transaction.delete(mem_ref)
+        transaction.update(club_ref, count_updates(count_deltas(snap.to_dict(), None)))
+        return True
+
+    return _delete(db.transaction())
+
+def compute_club_counts(club_ref) -> Dict[str, int]:
+    """Count a club's memberships with aggregation queries, without streaming them"""
+    memberships = club_ref.collection("memberships")
+    total = memberships.count().get()[0][0].value
+    active = memberships.where(filter=FieldFilter("status", "==", "active")).count().get()[0][0].value
+    return {MEMBER_COUNT: int(total), ACTIVE_MEMBER_COUNT: int(active)}
+
+def recount_all_clubs(db) -> int:
+    """Repair job: recompute every club's counts; returns the number that were wrong"""
+    fixed = 0
+    for snap in db.collection("clubs").stream():
+        data = snap.to_dict()
+        counts = compute_club_counts(snap.reference)
+        if any(data.get(field) != value for field, value in counts.items()):
+            snap.reference.update(counts)
+            fixed += 1
+    return fixed
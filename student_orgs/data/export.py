@@ -0,0 +1,95 @@
+"""Streaming CSV/JSONL exports of the collections and of club rosters.
+
+Documents are read in pages ordered by document id and written out as each
+page arrives, so an export holds one page in memory whatever the collection
+size. The Flask routes and the CLI share the generators here.
+"""
+from __future__ import annotations
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from data.lookups import get_docs_by_id
+from data.pagination import iter_pages
+
+EXPORT_PAGE_SIZE = 500
+
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+def document_rows(db, collection: str, columns: Sequence[str]) -> Iterator[Dict]:
+    """One row per document of a top-level collection: `id` and the other `columns`"""
+    fields = [column for column in columns if column != "id"]
+    for page in iter_pages(db.collection(collection), EXPORT_PAGE_SIZE, fields=fields):
+        for snap in page:
+            yield {"id": snap.id, **(snap.to_dict() or {})}
+
+def roster_export_rows(db) -> Iterator[Dict]:
+    """Every membership of every club, flattened with its club name and person details
+
+    The clubs and people of each page are fetched in batched reads.
+    """
+    for page in iter_pages(db.collection_group("memberships"), EXPORT_PAGE_SIZE,
+                           fields=("personId", "role", "status", "title", "createdAt")):
+        club_ids = [snap.reference.parent.parent.id for snap in page]
+        rows = [{"clubId": club_id, "membershipId": snap.id, **(snap.to_dict() or {})}
+                for club_id, snap in zip(club_ids, page)]
+        clubs = get_docs_by_id(db, "clubs", club_ids, field_paths=["name"])
+        people = get_docs_by_id(db, "people", (row.get("personId") for row in rows),
+                                field_paths=["name", "email", "studentId"])
+        for row in rows:
+            club = clubs.get(row["clubId"])
+            person = people.get(row.get("personId"))
+            person_data = person.to_dict() if person else {}
+            row["clubName"] = (club.to_dict() or {}).get("name") if club else None
+            row["personName"] = person_data.get("name")
+            row["personEmail"] = person_data.get("email")
+            row["studentId"] = person_data.get("studentId")
+            yield row
+
+# name -> (columns, row generator)
+EXPORTS: Dict[str, Tuple[Tuple[str, ...], Callable[..., Iterator[Dict]]]] = {}
+
+def _collection_export(collection: str, columns: Tuple[str, ...]):
+    return columns, lambda db: document_rows(db, collection, columns)
+
+EXPORTS["universities"] = _collection_export("universities", ("id", "name", "domain", "createdAt"))
+EXPORTS["clubs"] = _collection_export(
+    "clubs", ("id", "name", "universityId", "description", "memberCount", "activeMemberCount", "createdAt"))
+EXPORTS["people"] = _collection_export("people", ("id", "name", "email", "studentId", "createdAt"))
+EXPORTS["memberships"] = (
+    ("clubId", "clubName", "membershipId", "personId", "personName", "personEmail", "studentId",
+     "role", "status", "title", "createdAt"),
+    roster_export_rows,
+)
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def csv_lines(rows: Iterator[Dict], columns: Sequence[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(["" if row.get(column) is None else _plain(row.get(column)) for column in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone, when there are no rows
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+def jsonl_lines(rows: Iterator[Dict], columns: Sequence[str]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps({column: _plain(row.get(column)) for column in columns}) + "\n"
+
+def export_lines(db, name: str, fmt: str) -> Iterator[str]:
+    """Lines of the `name` export in `fmt` ("csv" or "jsonl"); raises KeyError for unknown ones"""
+    columns, rows = EXPORTS[name]
+    if fmt not in FORMATS:
+        raise KeyError(fmt)
+    lines = csv_lines if fmt == "csv" else jsonl_lines
+    return lines(rows(db), columns)
@@ -0,0 +1,52 @@
+"""Shared, bounded thread pool for issuing independent Firestore reads concurrently."""
+from __future__ import annotations
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+from data import opstats
+
+# Threads shared by every request in the process; extra calls queue rather than spawn
+FANOUT_WORKERS = int(os.getenv("FIRESTORE_FANOUT_WORKERS", "8"))
+
+T = TypeVar("T")
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_worker = threading.local()
+
+def _mark_worker() -> None:
+    _worker.active = True
+
+def executor() -> ThreadPoolExecutor:
+    """The process-wide fan-out pool, created on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=max(1, FANOUT_WORKERS),
+                                           thread_name_prefix="firestore-fanout", initializer=_mark_worker)
+    return _pool
+
+def run_all(*calls: Callable[[], T]) -> List[T]:
+    """Run independent zero-argument calls concurrently; results keep the order of `calls`
+
+    The first call runs on the calling thread while the rest go to the pool.
+    Inside a pool worker everything runs inline, so nested fan-outs cannot
+    starve the pool. The first exception raised is re-raised.
+    """
+    if len(calls) <= 1 or getattr(_worker, "active", False) or FANOUT_WORKERS <= 1:
+        return [call() for call in calls]
+    futures = [opstats.submit(executor(), call) for call in calls[1:]]
+    try:
+        first = calls[0]()
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return [first] + [future.result() for future in futures]
+
+def map_ordered(fn: Callable[..., T], items: Sequence) -> List[T]:
+    """`[fn(item) for item in items]`, with the calls made concurrently"""
+    return run_all(*(lambda item=item: fn(item) for item in items))
@@ -0,0 +1,52 @@
+"""Batched document lookups used to join related collections."""
+from __future__ import annotations
+from typing import Dict, Iterable, List, Iterator, Optional, Sequence
+
+from data.fanout import map_ordered
+
+# Keep every BatchGetDocuments request bounded, no matter how many ids a page needs
+GET_ALL_CHUNK_SIZE = 100
+
+def chunked(items: List, size: int) -> Iterator[List]:
+    """Yield successive slices of `items` with at most `size` entries"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def get_docs_by_id(db, collection: str, ids: Iterable[str],
+                   field_paths: Optional[Sequence[str]] = None) -> Dict[str, object]:
+    """Fetch the distinct ids of `collection` with get_all; missing ids are left out
+
+    With `field_paths`, only those fields are transferred (a Firestore field mask).
+    Chunks are requested concurrently on the shared fan-out pool.
+    """
+    unique_ids = list(dict.fromkeys(i for i in ids if i))
+    col = db.collection(collection)
+    mask = list(field_paths) if field_paths is not None else None
+
+    def fetch(chunk):
+        return list(db.get_all([col.document(i) for i in chunk], field_paths=mask))
+
+    found = {}
+    for snaps in map_ordered(fetch, list(chunked(unique_ids, GET_ALL_CHUNK_SIZE))):
+        for snap in snaps:
+            if snap.exists:
+                found[snap.id] = snap
+    return found
+
+def get_names_by_id(db, collection: str, ids: Iterable[str], field: str = "name") -> Dict[str, str]:
+    """Map each existing document id to one of its fields, fetching only that field"""
+    docs = get_docs_by_id(db, collection, ids, field_paths=[field])
+    return {doc_id: (snap.to_dict() or {}).get(field) for doc_id, snap in docs.items()}
+
+def attach_university_names(db, clubs: List[dict], known: Optional[Dict[str, str]] = None) -> List[dict]:
+    """Set `universityName` on each club dict using a single batched universities read
+
+    Names already in `known` (e.g. from a cache) are not fetched again.
+    """
+    names = dict(known or {})
+    missing = [c.get("universityId") for c in clubs if c.get("universityId") not in names]
+    if missing:
+        names.update(get_names_by_id(db, "universities", missing))
+    for club in clubs:
+        club["universityName"] = names.get(club.get("universityId")) or "Unknown"
+    return clubs
@@ -0,0 +1,786 @@
+"""In-memory stand-in for the subset of the Firestore client this app uses.
+
+Selected with FIRESTORE_BACKEND=memory. It supports collections and
+subcollections, collection-group queries, where/order_by/limit/cursors,
+select, count() aggregations, get_all, batches and transactions, with the
+same ordering and cursor rules as Firestore, plus on_snapshot listeners.
+AsyncMemoryClient offers the read side of the same data through the
+AsyncClient interface. Everything lives in one process and is lost on exit,
+so it is meant for local runs, load tests and benchmarks.
+"""
+from __future__ import annotations
+import copy
+import random
+import string
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.api_core import exceptions
+from google.cloud.firestore_v1 import transforms
+from google.cloud.firestore_v1.watch import ChangeType, DocumentChange
+
+from data import opstats
+
+# Firestore rejects batches and transactions with more than 500 writes
+MAX_WRITES_PER_COMMIT = 500
+_DOCUMENT_ID = "__name__"
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+def _auto_id() -> str:
+    return "".join(random.choice(_ID_ALPHABET) for _ in range(20))
+
+# ── value ordering (mirrors Firestore's cross-type ordering)
+def _type_rank(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    if isinstance(value, DocumentReference):
+        return 6
+    if isinstance(value, (list, tuple)):
+        return 8
+    return 9
+
+def _cmp(a, b) -> int:
+    rank_a, rank_b = _type_rank(a), _type_rank(b)
+    if rank_a != rank_b:
+        return -1 if rank_a < rank_b else 1
+    if rank_a == 3:
+        a, b = [v if v.tzinfo else v.replace(tzinfo=timezone.utc) for v in (a, b)]
+    elif rank_a == 6:
+        a, b = a._path, b._path
+    elif rank_a == 8:
+        for x, y in zip(a, b):
+            result = _cmp(x, y)
+            if result:
+                return result
+        a, b = len(a), len(b)
+    elif rank_a == 9:
+        a, b = repr(a), repr(b)
+    return (a > b) - (a < b)
+
+_MISSING = object()
+
+def _get_field(data: Dict, field_path: str):
+    value = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+def _set_field(data: Dict, field_path: str, value) -> None:
+    parts = field_path.split(".")
+    for part in parts[:-1]:
+        data = data.setdefault(part, {})
+    data[parts[-1]] = value
+
+def _delete_field(data: Dict, field_path: str) -> None:
+    parts = field_path.split(".")
+    for part in parts[:-1]:
+        data = data.get(part)
+        if not isinstance(data, dict):
+            return
+    data.pop(parts[-1], None)
+
+def _apply_value(data: Dict, field_path: str, value) -> None:
+    """Write one field, resolving the sentinels/transforms the app uses"""
+    if value is transforms.DELETE_FIELD:
+        _delete_field(data, field_path)
+    elif value is transforms.SERVER_TIMESTAMP:
+        _set_field(data, field_path, datetime.now(timezone.utc))
+    elif isinstance(value, transforms.Increment):
+        current = _get_field(data, field_path)
+        base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+        _set_field(data, field_path, base + value.value)
+    else:
+        _set_field(data, field_path, copy.deepcopy(value))
+
+def _resolve_document(data: Dict) -> Dict:
+    """Copy of a document being set, with sentinels applied"""
+    resolved: Dict = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            value = _resolve_document(value)
+        _apply_value(resolved, key, value)
+    return resolved
+
+# ── snapshots and references
+class DocumentSnapshot:
+    def __init__(self, reference: "DocumentReference", data: Optional[Dict], field_paths=None):
+        self.reference = reference
+        self._data = data
+        if data is not None and field_paths is not None:
+            projected: Dict = {}
+            for path in field_paths:
+                value = _get_field(data, path)
+                if value is not _MISSING:
+                    _set_field(projected, path, value)
+            self._data = projected
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str):
+        value = _get_field(self._data or {}, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+class DocumentReference:
+    def __init__(self, client: "MemoryClient", path: Tuple[str, ...]):
+        self._client = client
+        self._path = path
+
+    @property
+    def id(self) -> str:
+        return self._path[-1]
+
+    @property
+    def path(self) -> str:
+        return "/".join(self._path)
+
+    @property
+    def parent(self) -> "CollectionReference":
+        return CollectionReference(self._client, self._path[:-1])
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other._path == self._path
+
+    def __hash__(self):
+        return hash(self._path)
+
+    def __repr__(self):
+        return f"<DocumentReference {self.path}>"
+
+    def collection(self, collection_id: str) -> "CollectionReference":
+        return CollectionReference(self._client, self._path + (collection_id,))
+
+    def get(self, field_paths: Optional[Iterable[str]] = None, transaction=None) -> DocumentSnapshot:
+        return self._client._read(self, field_paths)
+
+    def set(self, document_data: Dict, merge: bool = False):
+        self._client._commit([("set", self, document_data, merge)])
+
+    def create(self, document_data: Dict):
+        self._client._commit([("create", self, document_data, False)])
+
+    def update(self, field_updates: Dict):
+        self._client._commit([("update", self, field_updates, False)])
+
+    def delete(self):
+        self._client._commit([("delete", self, None, False)])
+
+# ── queries
+class AggregationResult:
+    def __init__(self, alias: str, value):
+        self.alias = alias
+        self.value = value
+
+class AggregationQuery:
+    def __init__(self, query: "Query", alias: Optional[str]):
+        self._query = query
+        self._alias = alias or "field_1"
+
+    def get(self, transaction=None) -> List[List[AggregationResult]]:
+        started = time.perf_counter()
+        count = sum(1 for _ in self._query._matching())
+        self._query._client._record_call("run_aggregation_query", self._query._parent_path[-1], started, reads=1)
+        return [[AggregationResult(self._alias, count)]]
+
+class Query:
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+    def __init__(self, client: "MemoryClient", parent_path: Tuple[str, ...], all_descendants: bool = False):
+        self._client = client
+        self._parent_path = parent_path
+        self._all_descendants = all_descendants
+        self._filters: List[Tuple[str, str, Any]] = []
+        self._orders: List[Tuple[str, str]] = []
+        self._limit: Optional[int] = None
+        self._limit_to_last = False
+        self._start: Optional[Tuple[list, bool]] = None  # (values, inclusive)
+        self._end: Optional[Tuple[list, bool]] = None
+        self._projection: Optional[List[str]] = None
+
+    def _copy(self) -> "Query":
+        clone = Query.__new__(Query)
+        clone.__dict__.update(self.__dict__)
+        clone._filters = list(self._filters)
+        clone._orders = list(self._orders)
+        return clone
+
+    # builder methods
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        clone = self._copy()
+        clone._filters.append((str(field_path), op_string, value))
+        return clone
+
+    def order_by(self, field_path, direction: str = ASCENDING):
+        clone = self._copy()
+        clone._orders.append((str(field_path), direction))
+        return clone
+
+    def limit(self, count: int):
+        clone = self._copy()
+        clone._limit, clone._limit_to_last = count, False
+        return clone
+
+    def limit_to_last(self, count: int):
+        clone = self._copy()
+        clone._limit, clone._limit_to_last = count, True
+        return clone
+
+    def select(self, field_paths: Iterable[str]):
+        clone = self._copy()
+        clone._projection = [str(p) for p in field_paths if str(p) != _DOCUMENT_ID]
+        return clone
+
+    def _cursor(self, document_fields) -> list:
+        if isinstance(document_fields, DocumentSnapshot):
+            values = []
+            for field, _ in self._normalized_orders():
+                if field == _DOCUMENT_ID:
+                    values.append(document_fields.reference)
+                else:
+                    values.append(_get_field(document_fields._data or {}, field))
+            return values
+        if isinstance(document_fields, dict):
+            return [document_fields[field] for field, _ in self._orders if field in document_fields]
+        return list(document_fields)
+
+    def start_at(self, document_fields):
+        clone = self._copy()
+        clone._start = (self._cursor(document_fields), True)
+        return clone
+
+    def start_after(self, document_fields):
+        clone = self._copy()
+        clone._start = (self._cursor(document_fields), False)
+        return clone
+
+    def end_at(self, document_fields):
+        clone = self._copy()
+        clone._end = (self._cursor(document_fields), True)
+        return clone
+
+    def end_before(self, document_fields):
+        clone = self._copy()
+        clone._end = (self._cursor(document_fields), False)
+        return clone
+
+    def count(self, alias: Optional[str] = None) -> AggregationQuery:
+        return AggregationQuery(self, alias)
+
+    # execution
+    def _normalized_orders(self) -> List[Tuple[str, str]]:
+        orders = list(self._orders)
+        if not any(field == _DOCUMENT_ID for field, _ in orders):
+            direction = orders[-1][1] if orders else self.ASCENDING
+            orders.append((_DOCUMENT_ID, direction))
+        return orders
+
+    def _value(self, ref: DocumentReference, data: Dict, field: str):
+        return ref if field == _DOCUMENT_ID else _get_field(data, field)
+
+    def _matches(self, ref: DocumentReference, data: Dict) -> bool:
+        for field, op, expected in self._filters:
+            value = self._value(ref, data, field)
+            if isinstance(expected, str) and field == _DOCUMENT_ID:
+                expected = DocumentReference(self._client, ref._path[:-1] + (expected,))
+            if op == "!=" or op == "not-in":
+                if value is _MISSING or value is None:
+                    return False
+                if op == "!=" and _cmp(value, expected) == 0:
+                    return False
+                if op == "not-in" and any(_cmp(value, v) == 0 for v in expected):
+                    return False
+                continue
+            if value is _MISSING:
+                return False
+            if op == "==":
+                ok = _cmp(value, expected) == 0
+            elif op == "in":
+                ok = any(_cmp(value, v) == 0 for v in expected)
+            elif op == "array_contains":
+                ok = isinstance(value, list) and any(_cmp(v, expected) == 0 for v in value)
+            elif op == "array_contains_any":
+                ok = isinstance(value, list) and any(_cmp(v, e) == 0 for v in value for e in expected)
+            elif op in ("<", "<=", ">", ">="):
+                # Range filters only match values of the same type
+                if _type_rank(value) != _type_rank(expected):
+                    return False
+                result = _cmp(value, expected)
+                ok = {"<": result < 0, "<=": result <= 0, ">": result > 0, ">=": result >= 0}[op]
+            else:
+                raise ValueError(f"Unsupported operator: {op}")
+            if not ok:
+                return False
+        return True
+
+    def _compare_to_cursor(self, key: list, cursor: list, orders) -> int:
+        for value, bound, (_, direction) in zip(key, cursor, orders):
+            result = _cmp(value, bound)
+            if direction == self.DESCENDING:
+                result = -result
+            if result:
+                return result
+        return 0
+
+    def _matching(self) -> Iterable[Tuple[DocumentReference, Dict]]:
+        orders = self._normalized_orders()
+        rows = []
+        for ref, data in self._client._documents(self._parent_path, self._all_descendants):
+            if not self._matches(ref, data):
+                continue
+            key = [self._value(ref, data, field) for field, _ in orders]
+            # Documents missing an ordered field are excluded, as in Firestore
+            if any(value is _MISSING for value in key):
+                continue
+            rows.append((key, ref, data))
+
+        def sort_key(row):
+            return _SortKey(row[0], orders)
+        rows.sort(key=sort_key)
+
+        if self._start is not None:
+            cursor, inclusive = self._start
+            cursor = self._cursor_refs(cursor, orders)
+            rows = [r for r in rows if (self._compare_to_cursor(r[0], cursor, orders) >= 0 if inclusive
+                                        else self._compare_to_cursor(r[0], cursor, orders) > 0)]
+        if self._end is not None:
+            cursor, inclusive = self._end
+            cursor = self._cursor_refs(cursor, orders)
+            rows = [r for r in rows if (self._compare_to_cursor(r[0], cursor, orders) <= 0 if inclusive
+                                        else self._compare_to_cursor(r[0], cursor, orders) < 0)]
+        if self._limit is not None:
+            rows = rows[-self._limit:] if self._limit_to_last else rows[:self._limit]
+            if self._limit_to_last and self._limit == 0:
+                rows = []
+        return [(ref, data) for _, ref, data in rows]
+
+    def _cursor_refs(self, cursor: list, orders) -> list:
+        values = list(cursor)
+        for index, (field, _) in enumerate(orders[:len(values)]):
+            if field == _DOCUMENT_ID and isinstance(values[index], str):
+                values[index] = DocumentReference(self._client, self._parent_path + (values[index],))
+        return values
+
+    def _snapshots(self) -> List[DocumentSnapshot]:
+        started = time.perf_counter()
+        with self._client._lock:
+            rows = self._matching()
+            snaps = [DocumentSnapshot(ref, data, self._projection) for ref, data in rows]
+        self._client._record_call("run_query", self._parent_path[-1], started, reads=max(1, len(snaps)))
+        return snaps
+
+    def stream(self, transaction=None):
+        if self._limit_to_last:
+            raise ValueError("Query results for queries that include limit_to_last() "
+                             "constraints cannot be streamed. Use Query.get() instead.")
+        yield from self._snapshots()
+
+    def get(self, transaction=None) -> List[DocumentSnapshot]:
+        return self._snapshots()
+
+    def on_snapshot(self, callback) -> "Watch":
+        """Call `callback(docs, changes, read_time)` now and after every commit that changes the results"""
+        watch = Watch(self, callback)
+        with self._client._lock:
+            self._client._watches.append(watch)
+            watch._push()
+        return watch
+
+class Watch:
+    """Listener handle returned by on_snapshot(); pushes run synchronously after commits"""
+
+    def __init__(self, query: Query, callback):
+        self._query = query
+        self._callback = callback
+        self._previous: Dict[Tuple[str, ...], Tuple[int, Dict]] = {}
+        self._pushed = False
+        self._closed = False
+
+    @property
+    def is_active(self) -> bool:
+        return not self._closed
+
+    def _affected_by(self, paths) -> bool:
+        query = self._query
+        if query._all_descendants:
+            return any(path[-2] == query._parent_path[-1] for path in paths)
+        return any(path[:-1] == query._parent_path for path in paths)
+
+    def _push(self) -> None:
+        rows = self._query._matching()
+        current = {ref._path: (index, data) for index, (ref, data) in enumerate(rows)}
+        docs = [DocumentSnapshot(ref, data, self._query._projection) for ref, data in rows]
+        changes = []
+        for path, (index, data) in current.items():
+            before = self._previous.get(path)
+            if before is None:
+                changes.append(DocumentChange(ChangeType.ADDED, docs[index], -1, index))
+            elif before[1] != data:
+                changes.append(DocumentChange(ChangeType.MODIFIED, docs[index], before[0], index))
+        for path, (index, data) in self._previous.items():
+            if path not in current:
+                removed = DocumentSnapshot(DocumentReference(self._query._client, path), data)
+                changes.append(DocumentChange(ChangeType.REMOVED, removed, index, -1))
+        # Firestore skips pushes without changes, except the first one
+        if changes or not self._pushed:
+            self._pushed = True
+            self._callback(docs, changes, datetime.now(timezone.utc))
+        # Commits replace document dicts rather than mutating them, so keeping references is safe
+        self._previous = current
+
+    def close(self, reason=None) -> None:
+        with self._query._client._lock:
+            self._closed = True
+            if self in self._query._client._watches:
+                self._query._client._watches.remove(self)
+
+    def unsubscribe(self) -> None:
+        self.close()
+
+class _SortKey:
+    """Total order over query keys honouring per-field directions"""
+    __slots__ = ("key", "orders")
+
+    def __init__(self, key, orders):
+        self.key = key
+        self.orders = orders
+
+    def __lt__(self, other):
+        for a, b, (_, direction) in zip(self.key, other.key, self.orders):
+            result = _cmp(a, b)
+            if result:
+                return result < 0 if direction != Query.DESCENDING else result > 0
+        return False
+
+class CollectionReference(Query):
+    def __init__(self, client: "MemoryClient", path: Tuple[str, ...]):
+        super().__init__(client, path)
+        self._path = path
+
+    @property
+    def id(self) -> str:
+        return self._path[-1]
+
+    @property
+    def parent(self) -> Optional[DocumentReference]:
+        return DocumentReference(self._client, self._path[:-1]) if len(self._path) > 1 else None
+
+    def document(self, document_id: Optional[str] = None) -> DocumentReference:
+        return DocumentReference(self._client, self._path + (document_id or _auto_id(),))
+
+    def add(self, document_data: Dict, document_id: Optional[str] = None):
+        ref = self.document(document_id)
+        ref.create(document_data)
+        return datetime.now(timezone.utc), ref
+
+    def list_documents(self) -> List[DocumentReference]:
+        with self._client._lock:
+            return [DocumentReference(self._client, self._path + (doc_id,))
+                    for doc_id in self._client._collections.get(self._path, {})]
+
+# ── writes
+class WriteBatch:
+    def __init__(self, client: "MemoryClient"):
+        self._client = client
+        self._writes: List[Tuple] = []
+
+    def __len__(self):
+        return len(self._writes)
+
+    def set(self, reference, document_data: Dict, merge: bool = False):
+        self._writes.append(("set", reference, document_data, merge))
+        return self
+
+    def create(self, reference, document_data: Dict):
+        self._writes.append(("create", reference, document_data, False))
+        return self
+
+    def update(self, reference, field_updates: Dict):
+        self._writes.append(("update", reference, field_updates, False))
+        return self
+
+    def delete(self, reference):
+        self._writes.append(("delete", reference, None, False))
+        return self
+
+    def commit(self):
+        writes, self._writes = self._writes, []
+        self._client._commit(writes)
+        return []
+
+class Transaction(WriteBatch):
+    """Transactions hold the client lock from begin to commit, so they run serially"""
+    _max_attempts = 5
+    _read_only = False
+
+    def __init__(self, client: "MemoryClient"):
+        super().__init__(client)
+        self._id = None
+
+    @property
+    def in_progress(self) -> bool:
+        return self._id is not None
+
+    @property
+    def id(self):
+        return self._id
+
+    def _clean_up(self):
+        self._writes = []
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        started = time.perf_counter()
+        self._client._lock.acquire()
+        self._id = _auto_id().encode()
+        self._client._record_call("begin_transaction", "", started)
+
+    def _commit(self):
+        try:
+            writes, self._writes = self._writes, []
+            self._client._commit(writes)
+        finally:
+            self._release()
+        return []
+
+    def _rollback(self):
+        started = time.perf_counter()
+        self._writes = []
+        self._release()
+        self._client._record_call("rollback", "", started)
+
+    def _release(self):
+        if self._id is not None:
+            self._id = None
+            self._client._lock.release()
+
+    def get_all(self, references, field_paths=None):
+        return self._client.get_all(references, field_paths)
+
+    def get(self, ref_or_query):
+        if isinstance(ref_or_query, DocumentReference):
+            return iter([ref_or_query.get()])
+        return ref_or_query.stream()
+
+class MemoryClient:
+    """Drop-in for firestore.Client covering the calls this app makes"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # collection path -> {document id -> data}
+        self._collections: Dict[Tuple[str, ...], Dict[str, Dict]] = {}
+        self._watches: List[Watch] = []
+        # billed operations since the last reset_counts()
+        self.calls = 0
+        self.reads = 0
+        self.writes = 0
+
+    # bookkeeping hook, one call per simulated round-trip, named after the matching RPC
+    def _record_call(self, op: str, collection: str, started: float, reads: int = 0, writes: int = 0) -> None:
+        with self._lock:
+            self.calls += 1
+            self.reads += reads
+            self.writes += writes
+        opstats.record(op, collection, reads=reads, writes=writes, seconds=time.perf_counter() - started)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "reads": self.reads, "writes": self.writes}
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.calls = self.reads = self.writes = 0
+
+    def collection(self, *path: str) -> CollectionReference:
+        parts = tuple("/".join(path).split("/"))
+        return CollectionReference(self, parts)
+
+    def document(self, *path: str) -> DocumentReference:
+        parts = tuple("/".join(path).split("/"))
+        return DocumentReference(self, parts)
+
+    def collection_group(self, collection_id: str) -> Query:
+        return Query(self, (collection_id,), all_descendants=True)
+
+    def collections(self) -> List[CollectionReference]:
+        with self._lock:
+            return [CollectionReference(self, path) for path in self._collections if len(path) == 1]
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def transaction(self, **kwargs) -> Transaction:
+        return Transaction(self)
+
+    def get_all(self, references: Iterable[DocumentReference], field_paths=None, transaction=None):
+        started = time.perf_counter()
+        refs = list(references)
+        with self._lock:
+            snaps = [DocumentSnapshot(ref, self._collections.get(ref._path[:-1], {}).get(ref.id), field_paths)
+                     for ref in refs]
+        self._record_call("batch_get_documents", refs[0]._path[-2] if refs else "", started,
+                          reads=max(1, len(snaps)))
+        yield from snaps
+
+    # internals
+    def _documents(self, parent_path: Tuple[str, ...], all_descendants: bool):
+        if all_descendants:
+            collection_id = parent_path[-1]
+            for path, docs in list(self._collections.items()):
+                if path[-1] == collection_id:
+                    for doc_id, data in list(docs.items()):
+                        yield DocumentReference(self, path + (doc_id,)), data
+        else:
+            for doc_id, data in list(self._collections.get(parent_path, {}).items()):
+                yield DocumentReference(self, parent_path + (doc_id,)), data
+
+    def _read(self, ref: DocumentReference, field_paths=None) -> DocumentSnapshot:
+        started = time.perf_counter()
+        with self._lock:
+            data = self._collections.get(ref._path[:-1], {}).get(ref.id)
+            snap = DocumentSnapshot(ref, data, field_paths)
+        self._record_call("batch_get_documents", ref._path[-2], started, reads=1)
+        return snap
+
+    def _commit(self, writes: List[Tuple]) -> None:
+        started = time.perf_counter()
+        if len(writes) > MAX_WRITES_PER_COMMIT:
+            raise exceptions.InvalidArgument(f"maximum {MAX_WRITES_PER_COMMIT} writes allowed per request")
+        with self._lock:
+            # Stage on copies so a failing write leaves nothing half-applied
+            staged: Dict[Tuple[str, ...], Optional[Dict]] = {}
+
+            def current(ref):
+                if ref._path in staged:
+                    return staged[ref._path]
+                return self._collections.get(ref._path[:-1], {}).get(ref.id)
+
+            for kind, ref, data, merge in writes:
+                existing = current(ref)
+                if kind == "create":
+                    if existing is not None:
+                        raise exceptions.AlreadyExists(f"Document already exists: {ref.path}")
+                    staged[ref._path] = _resolve_document(data)
+                elif kind == "set":
+                    if merge and existing is not None:
+                        merged = copy.deepcopy(existing)
+                        for key, value in data.items():
+                            _apply_value(merged, key, value)
+                        staged[ref._path] = merged
+                    else:
+                        staged[ref._path] = _resolve_document(data)
+                elif kind == "update":
+                    if existing is None:
+                        raise exceptions.NotFound(f"No document to update: {ref.path}")
+                    updated = copy.deepcopy(existing)
+                    for key, value in data.items():
+                        _apply_value(updated, str(key), value)
+                    staged[ref._path] = updated
+                elif kind == "delete":
+                    staged[ref._path] = None
+
+            for path, data in staged.items():
+                docs = self._collections.setdefault(path[:-1], {})
+                if data is None:
+                    docs.pop(path[-1], None)
+                    if not docs:
+                        del self._collections[path[:-1]]
+                else:
+                    docs[path[-1]] = data
+            for watch in list(self._watches):
+                if watch._affected_by(staged):
+                    watch._push()
+        collections = {ref._path[-2] for _, ref, _, _ in writes}
+        collection = collections.pop() if len(collections) == 1 else ("mixed" if collections else "")
+        self._record_call("commit", collection, started, writes=len(writes))
+
+# ── async facade (stand-in for firestore.AsyncClient)
+class AsyncDocumentReference:
+    def __init__(self, ref: DocumentReference):
+        self._ref = ref
+
+    @property
+    def id(self) -> str:
+        return self._ref.id
+
+    @property
+    def path(self) -> str:
+        return self._ref.path
+
+    def collection(self, collection_id: str) -> "AsyncQuery":
+        return AsyncQuery(self._ref.collection(collection_id))
+
+    async def get(self, field_paths: Optional[Iterable[str]] = None, transaction=None) -> DocumentSnapshot:
+        return self._ref.get(field_paths)
+
+class AsyncQuery:
+    """Async view of a query or collection; builder methods stay synchronous"""
+
+    def __init__(self, query: Query):
+        self._query = query
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if isinstance(result, Query):
+                return AsyncQuery(result)
+            if isinstance(result, DocumentReference):
+                return AsyncDocumentReference(result)
+            return result
+        return call
+
+    async def get(self, transaction=None) -> List[DocumentSnapshot]:
+        return self._query.get()
+
+    async def stream(self, transaction=None):
+        for snap in self._query.stream():
+            yield snap
+
+class AsyncMemoryClient:
+    """Drop-in for firestore.AsyncClient over the same data as a MemoryClient"""
+
+    def __init__(self, client: MemoryClient):
+        self._client = client
+
+    def collection(self, *path: str) -> AsyncQuery:
+        return AsyncQuery(self._client.collection(*path))
+
+    def document(self, *path: str) -> AsyncDocumentReference:
+        return AsyncDocumentReference(self._client.document(*path))
+
+    def collection_group(self, collection_id: str) -> AsyncQuery:
+        return AsyncQuery(self._client.collection_group(collection_id))
+
+    async def get_all(self, references: Iterable[AsyncDocumentReference], field_paths=None, transaction=None):
+        for snap in self._client.get_all([ref._ref for ref in references], field_paths):
+            yield snap
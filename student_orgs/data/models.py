@@ -0,0 +1,54 @@
+"""Document shapes stored in Firestore."""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+@dataclass
+class University:
+    name: str
+    domain: Optional[str] = None
+    createdAt: datetime = None
+
+    def __post_init__(self):
+        if self.createdAt is None:
+            self.createdAt = _now()
+
+@dataclass
+class Club:
+    name: str
+    universityId: str
+    description: Optional[str] = None
+    memberCount: int = 0
+    activeMemberCount: int = 0
+    createdAt: datetime = None
+
+    def __post_init__(self):
+        if self.createdAt is None:
+            self.createdAt = _now()
+
+@dataclass
+class Person:
+    name: str
+    email: Optional[str] = None
+    studentId: Optional[str] = None
+    createdAt: datetime = None
+
+    def __post_init__(self):
+        if self.createdAt is None:
+            self.createdAt = _now()
+
+@dataclass
+class Membership:
+    personId: str
+    role: str = "member"         # "owner"|"officer"|"member"
+    status: str = "active"       # "active"|"inactive"
+    title: Optional[str] = None
+    createdAt: datetime = None
+
+    def __post_init__(self):
+        if self.createdAt is None:
+            self.createdAt = _now()
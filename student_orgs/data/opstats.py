@@ -0,0 +1,278 @@
+"""Per-request accounting of Firestore round-trips, documents read/written and time spent.
+
+Every backend reports its calls through record(): the real client once
+instrument_client() has wrapped its RPC methods, the in-memory client from its
+bookkeeping hook. The totals go to whichever OpStats is active in the current
+context (see track()), so the Flask app can report them per request.
+"""
+from __future__ import annotations
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+class OpStats:
+    """Running totals for one unit of work, safe to update from worker threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.reads = 0
+        self.writes = 0
+        self.seconds = 0.0
+
+    def add(self, reads: int = 0, writes: int = 0, seconds: float = 0.0) -> None:
+        with self._lock:
+            self.calls += 1
+            self.reads += reads
+            self.writes += writes
+            self.seconds += seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {"calls": self.calls, "reads": self.reads, "writes": self.writes,
+                    "ms": round(self.seconds * 1000, 2)}
+
+    def header_value(self) -> str:
+        """Compact form for a response header, e.g. `calls=3;reads=51;writes=0;ms=4.2`"""
+        return ";".join(f"{key}={value}" for key, value in self.as_dict().items())
+
+_current: contextvars.ContextVar[Optional[OpStats]] = contextvars.ContextVar("firestore_op_stats", default=None)
+
+def current() -> Optional[OpStats]:
+    return _current.get()
+
+def start() -> contextvars.Token:
+    """Make a fresh OpStats current; pass the token to stop() when done"""
+    return _current.set(OpStats())
+
+def stop(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+@contextmanager
+def track() -> Iterator[OpStats]:
+    """Collect the Firestore operations made inside the block
+
+        with opstats.track() as stats:
+            client.get("/clubs")
+        assert stats.calls <= 3
+    """
+    token = start()
+    try:
+        yield _current.get()
+    finally:
+        stop(token)
+
+# Called with (op, collection, reads, writes, seconds) for every round-trip, e.g. to feed metrics
+_listeners: List[Callable[[str, str, int, int, float], None]] = []
+
+def add_listener(listener: Callable[[str, str, int, int, float], None]) -> None:
+    _listeners.append(listener)
+
+def record(op: str, collection: str, reads: int = 0, writes: int = 0, seconds: float = 0.0) -> None:
+    """Account one round-trip against the current OpStats, if any, and tell the listeners"""
+    stats = _current.get()
+    if stats is not None:
+        stats.add(reads, writes, seconds)
+    for listener in _listeners:
+        listener(op, collection, reads, writes, seconds)
+
+def submit(pool, fn, *args, **kwargs):
+    """pool.submit() that runs `fn` in a copy of the caller's context
+
+    Worker threads do not inherit context variables, so without this their
+    Firestore calls would not be attributed to the request that started them.
+    """
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+# ── budgets
+class BudgetExceeded(Exception):
+    """A unit of work used more Firestore operations than its budget allows"""
+
+@dataclass
+class Budget:
+    """Upper bounds on Firestore usage; None means unbounded"""
+    calls: Optional[int] = None
+    reads: Optional[int] = None
+    writes: Optional[int] = None
+
+    def violations(self, stats: OpStats) -> List[str]:
+        used = stats.as_dict()
+        return [f"{field} {used[field]} > {limit}"
+                for field, limit in (("calls", self.calls), ("reads", self.reads), ("writes", self.writes))
+                if limit is not None and used[field] > limit]
+
+    def check(self, stats: OpStats) -> None:
+        problems = self.violations(stats)
+        if problems:
+            raise BudgetExceeded(", ".join(problems))
+
+# ── real client instrumentation
+def _collection_of(path: str) -> str:
+    """Collection id of a full document name (.../documents/clubs/x/memberships/y -> memberships)"""
+    parts = path.split("/")
+    return parts[-2] if len(parts) >= 2 else ""
+
+def _query_collection(structured_query) -> str:
+    try:
+        return structured_query.from_[0].collection_id
+    except (AttributeError, IndexError):
+        return ""
+
+def _write_collection(write) -> str:
+    name = write.delete or write.update.name or write.transform.document
+    return _collection_of(name)
+
+def _request_collection(method: str, request) -> str:
+    request = request or {}
+    if method == "run_query":
+        return _query_collection(request.get("structured_query"))
+    if method == "run_aggregation_query":
+        aggregation = request.get("structured_aggregation_query")
+        return _query_collection(getattr(aggregation, "structured_query", None))
+    if method == "batch_get_documents":
+        documents = request.get("documents") or []
+        return _collection_of(documents[0]) if documents else ""
+    if method == "commit":
+        collections = {_write_collection(write) for write in request.get("writes") or []}
+        return collections.pop() if len(collections) == 1 else ("mixed" if collections else "")
+    return ""
+
+class _TimedStream:
+    """Response stream that records its call once exhausted, timing only the RPC side"""
+
+    def __init__(self, stream, method: str, collection: str, seconds: float, count_reads):
+        self._stream = stream
+        self._method = method
+        self._collection = collection
+        self._seconds = seconds
+        self._count_reads = count_reads
+        self._reads = 0
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            response = next(self._stream)
+        except Exception:  # StopIteration included
+            self._finish(time.perf_counter() - started)
+            raise
+        self._seconds += time.perf_counter() - started
+        self._reads += self._count_reads(response)
+        return response
+
+    def _finish(self, seconds: float) -> None:
+        if not self._done:
+            self._done = True
+            # Firestore bills at least one read per query, even an empty one
+            record(self._method, self._collection, reads=max(1, self._reads), seconds=self._seconds + seconds)
+
+    def __del__(self):
+        # Streams abandoned part-way (e.g. a limit reached) still count
+        self._finish(0.0)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def _has(response, field: str) -> int:
+    pb = getattr(response, "_pb", response)
+    try:
+        return int(pb.HasField(field))
+    except ValueError:
+        return 0
+
+# method -> how many documents a streamed response accounts for
+_STREAMING = {
+    "run_query": lambda response: _has(response, "document"),
+    "batch_get_documents": lambda response: 1,
+    "run_aggregation_query": lambda response: 0,
+}
+_UNARY = ("commit", "begin_transaction", "rollback")
+
+class _AsyncTimedStream(_TimedStream):
+    """Async counterpart of _TimedStream for the AsyncClient's response streams"""
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        started = time.perf_counter()
+        try:
+            response = await self._stream.__anext__()
+        except BaseException:  # StopAsyncIteration and cancellation included
+            self._finish(time.perf_counter() - started)
+            raise
+        self._seconds += time.perf_counter() - started
+        self._reads += self._count_reads(response)
+        return response
+
+def instrument_async_client(client):
+    """Wrap the RPC methods of a google-cloud-firestore AsyncClient so they call record()"""
+    api = client._firestore_api
+
+    def wrap_streaming(method, count_reads):
+        original = getattr(api, method)
+
+        async def call(*args, request=None, **kwargs):
+            started = time.perf_counter()
+            stream = await original(*args, request=request, **kwargs)
+            return _AsyncTimedStream(stream.__aiter__(), method, _request_collection(method, request),
+                                     time.perf_counter() - started, count_reads)
+        setattr(api, method, call)
+
+    def wrap_unary(method):
+        original = getattr(api, method)
+
+        async def call(*args, request=None, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await original(*args, request=request, **kwargs)
+            finally:
+                writes = len((request or {}).get("writes") or []) if method == "commit" else 0
+                record(method, _request_collection(method, request), writes=writes,
+                       seconds=time.perf_counter() - started)
+        setattr(api, method, call)
+
+    for method, count_reads in _STREAMING.items():
+        wrap_streaming(method, count_reads)
+    for method in _UNARY:
+        wrap_unary(method)
+    return client
+
+def instrument_client(client):
+    """Wrap the RPC methods of a google-cloud-firestore client so they call record()"""
+    api = client._firestore_api
+
+    def wrap_streaming(method, count_reads):
+        original = getattr(api, method)
+
+        def call(*args, request=None, **kwargs):
+            started = time.perf_counter()
+            stream = original(*args, request=request, **kwargs)
+            return _TimedStream(iter(stream), method, _request_collection(method, request),
+                                time.perf_counter() - started, count_reads)
+        setattr(api, method, call)
+
+    def wrap_unary(method):
+        original = getattr(api, method)
+
+        def call(*args, request=None, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, request=request, **kwargs)
+            finally:
+                writes = len((request or {}).get("writes") or []) if method == "commit" else 0
+                record(method, _request_collection(method, request), writes=writes,
+                       seconds=time.perf_counter() - started)
+        setattr(api, method, call)
+
+    for method, count_reads in _STREAMING.items():
+        wrap_streaming(method, count_reads)
+    for method in _UNARY:
+        wrap_unary(method)
+    return client
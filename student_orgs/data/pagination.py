@@ -0,0 +1,130 @@
+"""Keyset pagination over name-ordered collections using Firestore cursors."""
+from __future__ import annotations
+import base64
+import bisect
+import json
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Sequence
+
+from google.cloud.firestore_v1.field_path import FieldPath
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+@dataclass
+class Page:
+    items: List = field(default_factory=list)
+    page_size: int = DEFAULT_PAGE_SIZE
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+def clamp_page_size(value, default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Parse a page-size request parameter, keeping it within 1..MAX_PAGE_SIZE"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def encode_cursor(snap, order_field: str = "name") -> str:
+    """Opaque URL-safe token holding the (order value, document id) of a snapshot"""
+    raw = json.dumps([(snap.to_dict() or {}).get(order_field), snap.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token: Optional[str]) -> Optional[list]:
+    """Inverse of encode_cursor; returns None for a missing or malformed token"""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(value, list) or len(value) != 2 or not isinstance(value[1], str):
+        return None
+    return value
+
+def iter_pages(query, page_size: int, fields: Optional[Sequence[str]] = None) -> Iterator[List]:
+    """Successive pages of every document matched by `query`, in document id order
+
+    For jobs that walk a whole collection (exports, backfills) rather than a
+    page a user asked for.
+    """
+    query = query.order_by(FieldPath.document_id()).limit(page_size)
+    if fields is not None:
+        query = query.select(list(fields))
+    last = None
+    while True:
+        page = list((query.start_after(last) if last is not None else query).stream())
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last = page[-1]
+
+def paginate(query, page_size: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None,
+             before: Optional[str] = None, order_field: str = "name",
+             fields: Optional[Sequence[str]] = None) -> Page:
+    """Fetch one page of `query` ordered by `order_field`, ties broken by document id
+
+    Pass the `next_cursor` of a page as `after` to move forward, or its
+    `prev_cursor` as `before` to move back. One extra document is read to
+    learn whether another page exists in that direction. With `fields`, only
+    those fields (plus `order_field`, needed for the cursors) are transferred.
+    """
+    if fields is not None:
+        query = query.select(list(dict.fromkeys([*fields, order_field])))
+    ordered = query.order_by(order_field).order_by(FieldPath.document_id())
+    after_key, before_key = decode_cursor(after), decode_cursor(before)
+
+    if before_key is not None:
+        # limit_to_last queries cannot be streamed, but the result is bounded anyway
+        snaps = ordered.end_before(before_key).limit_to_last(page_size + 1).get()
+        has_prev = len(snaps) > page_size
+        snaps = snaps[-page_size:]
+        has_next = True
+    else:
+        if after_key is not None:
+            ordered = ordered.start_after(after_key)
+        snaps = list(ordered.limit(page_size + 1).stream())
+        has_next = len(snaps) > page_size
+        snaps = snaps[:page_size]
+        has_prev = after_key is not None
+
+    return Page(
+        items=snaps,
+        page_size=page_size,
+        next_cursor=encode_cursor(snaps[-1], order_field) if has_next and snaps else None,
+        prev_cursor=encode_cursor(snaps[0], order_field) if has_prev and snaps else None,
+    )
+
+def paginate_sorted(snaps: List, keys: List[list], page_size: int = DEFAULT_PAGE_SIZE,
+                    after: Optional[str] = None, before: Optional[str] = None,
+                    order_field: str = "name") -> Page:
+    """paginate() over snapshots already held in memory
+
+    `snaps` must be sorted by `keys`, the [order value, document id] pairs that
+    the cursors encode, so pages and cursors match the Firestore path.
+    """
+    after_key, before_key = decode_cursor(after), decode_cursor(before)
+    try:
+        if before_key is not None:
+            end = bisect.bisect_left(keys, before_key)
+            start = max(0, end - page_size)
+            has_prev, has_next = start > 0, True
+        else:
+            start = bisect.bisect_right(keys, after_key) if after_key is not None else 0
+            end = start + page_size
+            has_prev, has_next = after_key is not None, end < len(snaps)
+    except TypeError:
+        # A cursor whose order value is not comparable (e.g. a tampered token) starts over
+        start, end = 0, page_size
+        has_prev, has_next = False, end < len(snaps)
+    items = snaps[start:end]
+
+    return Page(
+        items=items,
+        page_size=page_size,
+        next_cursor=encode_cursor(items[-1], order_field) if has_next and items else None,
+        prev_cursor=encode_cursor(items[0], order_field) if has_prev and items else None,
+    )
@@ -0,0 +1,134 @@
+"""In-process replicas of small collections kept current by snapshot listeners."""
+from __future__ import annotations
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from data.pagination import DEFAULT_PAGE_SIZE, Page, paginate_sorted
+
+# Seconds to wait before re-subscribing after a listener has shut down
+RESTART_BACKOFF = 30.0
+
+class CollectionReplica:
+    """Every document of one collection, mirrored by an on_snapshot listener
+
+    Readers call healthy() first and go to Firestore when it is False: before
+    the first snapshot has arrived and while the listener is down. A listener
+    that shut down is re-subscribed RESTART_BACKOFF seconds after it was first
+    seen down, and again that long after each failed attempt.
+    """
+
+    def __init__(self, collection_ref, order_field: str = "name", restart_backoff: float = RESTART_BACKOFF):
+        self.collection_ref = collection_ref
+        self.order_field = order_field
+        self.restart_backoff = restart_backoff
+        self._lock = threading.Lock()
+        # Held while re-subscribing; separate from _lock, which the first snapshot may need
+        self._restart_lock = threading.Lock()
+        self._watch = None
+        # when the listener was first seen down, or the last restart attempt failed
+        self._down_since: Optional[float] = None
+        self._ready = False
+        self._by_id: Dict[str, object] = {}
+        # documents having the order field, sorted by (order value, id), and their keys
+        self._sorted: List = []
+        self._keys: List[list] = []
+        self.read_time = None
+        self.pushes = 0
+
+    @property
+    def name(self) -> str:
+        return self.collection_ref.id
+
+    def start(self) -> "CollectionReplica":
+        with self._lock:
+            self._ready = False
+        # A listener left subscribed but unreferenced would keep receiving pushes forever.
+        # The closed one stays in _watch until the new one exists, so a failed start is retried.
+        if self._watch is not None:
+            self._watch.unsubscribe()
+        self._watch = self.collection_ref.on_snapshot(self._on_snapshot)
+        return self
+
+    def stop(self) -> None:
+        watch, self._watch = self._watch, None
+        if watch is not None:
+            watch.unsubscribe()
+        with self._lock:
+            self._ready = False
+
+    def _listening(self) -> bool:
+        return self._watch is not None and not getattr(self._watch, "_closed", False)
+
+    def healthy(self) -> bool:
+        if self._listening():
+            return self._ready
+        # Concurrent readers do not wait for a restart; they use Firestore meanwhile
+        if self._watch is None or not self._restart_lock.acquire(blocking=False):
+            return False
+        try:
+            if self._listening():
+                return self._ready
+            now = time.monotonic()
+            if self._down_since is None:
+                self._down_since = now
+            elif now - self._down_since >= self.restart_backoff:
+                try:
+                    self.start()
+                    self._down_since = None
+                except Exception:
+                    self._down_since = now
+            return False
+        finally:
+            self._restart_lock.release()
+
+    def _on_snapshot(self, docs, changes, read_time) -> None:
+        by_id = {doc.id: doc for doc in docs}
+        keyed = []
+        for doc in docs:
+            value = (doc.to_dict() or {}).get(self.order_field)
+            # Firestore's order_by leaves out documents without the field
+            if isinstance(value, str):
+                keyed.append(([value, doc.id], doc))
+        keyed.sort(key=lambda pair: pair[0])
+        with self._lock:
+            self._by_id = by_id
+            self._keys = [key for key, _ in keyed]
+            self._sorted = [doc for _, doc in keyed]
+            self.read_time = read_time
+            self.pushes += 1
+            self._ready = True
+
+    # reads; only meaningful while healthy()
+    def snapshots(self) -> List:
+        """Documents ordered by the order field, ties broken by id"""
+        with self._lock:
+            return list(self._sorted)
+
+    def get(self, doc_id: str):
+        with self._lock:
+            return self._by_id.get(doc_id)
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, object]:
+        with self._lock:
+            return {i: self._by_id[i] for i in ids if i in self._by_id}
+
+    def page(self, page_size: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None,
+             before: Optional[str] = None) -> Page:
+        with self._lock:
+            snaps, keys = self._sorted, self._keys
+        return paginate_sorted(snaps, keys, page_size=page_size, after=after, before=before,
+                               order_field=self.order_field)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "healthy": self._ready and self._listening(),
+                "documents": len(self._by_id),
+                "pushes": self.pushes,
+                "readTime": self.read_time.isoformat() if self.read_time else None,
+            }
+
+def start_replicas(db, names: Iterable[str]) -> Dict[str, CollectionReplica]:
+    """Start a replica for each named top-level collection"""
+    return {name: CollectionReplica(db.collection(name)).start() for name in names}
@@ -0,0 +1,229 @@
+"""Typed repositories: the one place the app and the CLI touch Firestore."""
+from __future__ import annotations
+from dataclasses import asdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from data.bulk_import import RosterImportResult, import_roster
+from data.cache import CacheBackend, TTLCache
+from data.cascade import BATCH_WRITE_LIMIT, CASCADE_DELETE_WORKERS, delete_club_cascade, delete_person_cascade, resume_club_deletes
+from data.counters import add_membership, delete_membership, recount_all_clubs, update_membership
+from data.lookups import attach_university_names, get_docs_by_id, get_names_by_id
+from data.models import Membership, Person, University
+from data.pagination import DEFAULT_PAGE_SIZE, Page, paginate
+from data.replica import CollectionReplica
+from data.roster import join_club_roster, join_person_clubs
+from data.search import DEFAULT_LIMIT, backfill_search_keys, search_people
+from data.uniqueness import (
+    UNIQUE_FIELDS, LookupBackfill, backfill_lookups, create_person, find_person_id, release_person, update_person,
+)
+
+class Repo:
+    """Base repository for a top-level collection ordered by `name`"""
+    collection_name = ""
+    # Field mask for the paged list view; None transfers whole documents
+    list_fields: Optional[Tuple[str, ...]] = None
+
+    def __init__(self, db, replica: Optional[CollectionReplica] = None):
+        self.db = db
+        # When given and healthy, list and name reads are served from this replica
+        self.replica = replica
+
+    def _live_replica(self) -> Optional[CollectionReplica]:
+        return self.replica if self.replica is not None and self.replica.healthy() else None
+
+    @property
+    def collection(self):
+        return self.db.collection(self.collection_name)
+
+    def ref(self, doc_id: str):
+        return self.collection.document(doc_id)
+
+    def get(self, doc_id: str, fields: Optional[Sequence[str]] = None):
+        """Snapshot for `doc_id` (only `fields` when given), or None when it does not exist"""
+        if not doc_id:
+            return None
+        snap = self.ref(doc_id).get(field_paths=list(fields) if fields is not None else None)
+        return snap if snap.exists else None
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, object]:
+        """Existing snapshots for `ids`, fetched with batched reads"""
+        replica = self._live_replica()
+        if replica:
+            return replica.get_many(ids)
+        return get_docs_by_id(self.db, self.collection_name, ids)
+
+    def names_by_id(self, ids: Iterable[str]) -> Dict[str, str]:
+        replica = self._live_replica()
+        if replica:
+            return {doc_id: (snap.to_dict() or {}).get("name") for doc_id, snap in replica.get_many(ids).items()}
+        return get_names_by_id(self.db, self.collection_name, ids)
+
+    def list_all(self) -> List:
+        replica = self._live_replica()
+        if replica:
+            return replica.snapshots()
+        return list(self.collection.order_by("name").stream())
+
+    def page(self, page_size: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None,
+             before: Optional[str] = None) -> Page:
+        replica = self._live_replica()
+        if replica:
+            return replica.page(page_size=page_size, after=after, before=before)
+        return paginate(self.collection, page_size=page_size, after=after, before=before,
+                        fields=self.list_fields)
+
+    def add(self, record) -> object:
+        """Store a dataclass record under a new id; returns its reference"""
+        ref = self.collection.document()
+        ref.set(asdict(record))
+        return ref
+
+    def update(self, doc_id: str, fields: Dict) -> None:
+        self.ref(doc_id).update(fields)
+
+    def delete(self, doc_id: str) -> None:
+        self.ref(doc_id).delete()
+
+    def count(self) -> int:
+        return int(self.collection.count().get()[0][0].value)
+
+class UniversityRepo(Repo):
+    """Universities, served through a read-through cache invalidated on every write"""
+    collection_name = "universities"
+    list_fields = ("name", "domain", "createdAt")
+
+    def __init__(self, db, cache: Optional[CacheBackend] = None, replica: Optional[CollectionReplica] = None):
+        super().__init__(db, replica=replica)
+        self.cache = cache if cache is not None else TTLCache()
+
+    # A healthy replica is fresher than the cache, so it is read directly
+    def list_all(self) -> List:
+        if self._live_replica():
+            return super().list_all()
+        return self.cache.get_or_load("all", super().list_all)
+
+    def page(self, page_size: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None,
+             before: Optional[str] = None) -> Page:
+        if self._live_replica():
+            return super().page(page_size, after, before)
+        return self.cache.get_or_load(
+            ("page", page_size, after, before),
+            lambda: super(UniversityRepo, self).page(page_size, after, before),
+        )
+
+    def cached_names(self) -> Dict[str, str]:
+        return {snap.id: (snap.to_dict() or {}).get("name") for snap in self.list_all()}
+
+    def attach_names(self, clubs: List[dict]) -> List[dict]:
+        """Set `universityName` on club dicts from the cache, batch-reading any unknown ids"""
+        return attach_university_names(self.db, clubs, known=self.cached_names())
+
+    def add(self, record: University):
+        ref = super().add(record)
+        self.cache.invalidate()
+        return ref
+
+    def update(self, doc_id: str, fields: Dict) -> None:
+        super().update(doc_id, fields)
+        self.cache.invalidate()
+
+    def delete(self, doc_id: str) -> None:
+        super().delete(doc_id)
+        self.cache.invalidate()
+
+class ClubRepo(Repo):
+    collection_name = "clubs"
+    # clubs.html shows a description excerpt, so the description still has to come along
+    list_fields = ("name", "universityId", "description", "memberCount", "activeMemberCount",
+                   "deleting", "createdAt")
+
+    def delete(self, doc_id: str, workers: int = CASCADE_DELETE_WORKERS, on_progress=None) -> int:
+        """Cascade-delete the club and its memberships; returns the memberships removed"""
+        return delete_club_cascade(self.db, self.ref(doc_id), workers=workers, on_progress=on_progress)
+
+    def resume_deletes(self, workers: int = CASCADE_DELETE_WORKERS) -> int:
+        return resume_club_deletes(self.db, workers=workers)
+
+    def recount_members(self) -> int:
+        return recount_all_clubs(self.db)
+
+class PersonRepo(Repo):
+    """People; every write keeps the normalized search fields and the email/studentId lookups in step"""
+    collection_name = "people"
+    list_fields = ("name", "email", "studentId", "createdAt")
+
+    def add(self, record: Person):
+        """Store a new person; raises DuplicateValue when its email or studentId is taken"""
+        ref = self.collection.document()
+        create_person(self.db, ref, asdict(record))
+        return ref
+
+    def update(self, doc_id: str, fields: Dict) -> None:
+        """Update a person; raises DuplicateValue when the new email or studentId is taken"""
+        update_person(self.db, self.ref(doc_id), fields)
+
+    def delete(self, doc_id: str) -> int:
+        """Cascade-delete the person and their memberships; returns the memberships removed"""
+        snap = self.get(doc_id, fields=UNIQUE_FIELDS)
+        removed = delete_person_cascade(self.db, self.ref(doc_id))
+        if snap:
+            release_person(self.db, doc_id, snap.to_dict() or {})
+        return removed
+
+    def find_id(self, field: str, value: str) -> Optional[str]:
+        """Id of the person with this email or studentId, in one lookup read"""
+        return find_person_id(self.db, field, value)
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[Dict]:
+        return search_people(self.db, query, limit=limit)
+
+    def backfill_search_keys(self) -> int:
+        return backfill_search_keys(self.db, batch_size=BATCH_WRITE_LIMIT)
+
+    def backfill_lookups(self) -> LookupBackfill:
+        return backfill_lookups(self.db)
+
+class MembershipRepo:
+    """Memberships, stored under clubs/{clubId}/memberships"""
+
+    def __init__(self, db, club_names: Optional[Callable[[Iterable[str]], Dict[str, str]]] = None):
+        self.db = db
+        # Resolves club ids to names for the person view, e.g. ClubRepo.names_by_id
+        self.club_names = club_names
+
+    def club_ref(self, club_id: str):
+        return self.db.collection("clubs").document(club_id)
+
+    def collection(self, club_id: str):
+        return self.club_ref(club_id).collection("memberships")
+
+    def get(self, club_id: str, member_id: str):
+        """Snapshot of one membership, or None when it does not exist"""
+        if not club_id or not member_id:
+            return None
+        snap = self.collection(club_id).document(member_id).get()
+        return snap if snap.exists else None
+
+    def list_for_club(self, club_id: str) -> List:
+        return list(self.collection(club_id).stream())
+
+    def roster(self, club_id: str) -> List[dict]:
+        """Memberships of a club joined with person name/email"""
+        return join_club_roster(self.db, self.club_ref(club_id))
+
+    def for_person(self, person_id: str) -> List[dict]:
+        """Memberships of a person across clubs, joined with club names"""
+        return join_person_clubs(self.db, person_id, club_names=self.club_names)
+
+    def add(self, club_id: str, record: Membership):
+        return add_membership(self.db, self.club_ref(club_id), asdict(record))
+
+    def update(self, club_id: str, member_id: str, fields: Dict) -> bool:
+        return update_membership(self.db, self.club_ref(club_id), self.collection(club_id).document(member_id), fields)
+
+    def delete(self, club_id: str, member_id: str) -> bool:
+        return delete_membership(self.db, self.club_ref(club_id), self.collection(club_id).document(member_id))
+
+    def import_roster(self, club_id: str, rows: Iterable[Tuple[int, Dict]]) -> RosterImportResult:
+        """Add the people named in roster rows (see data.bulk_import) to the club"""
+        return import_roster(self.db, self.club_ref(club_id), rows)
@@ -0,0 +1,67 @@
+"""Club roster join: memberships enriched with their person's details."""
+from __future__ import annotations
+from typing import Callable, Dict, Iterable, List, Optional
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from data.lookups import get_docs_by_id, get_names_by_id
+
+# Field masks for the roster views; anything else stored on these documents is not transferred
+MEMBERSHIP_FIELDS = ("personId", "role", "status", "title", "createdAt")
+ROSTER_PERSON_FIELDS = ("name", "email")
+
+def roster_rows(mem_docs: Iterable) -> List[dict]:
+    """Membership snapshots as dicts carrying their id"""
+    rows = []
+    for mem_doc in mem_docs:
+        row = mem_doc.to_dict()
+        row['id'] = mem_doc.id
+        rows.append(row)
+    return rows
+
+def attach_people(rows: List[dict], people: Dict[str, object]) -> List[dict]:
+    """Set `personName`/`personEmail` on roster rows from person snapshots keyed by id"""
+    for row in rows:
+        person = people.get(row.get('personId'))
+        person_data = person.to_dict() if person else {}
+        row['personName'] = person_data.get('name', 'Unknown') if person else 'Unknown'
+        row['personEmail'] = person_data.get('email', '') if person else ''
+    return rows
+
+def join_club_roster(db, club_ref) -> List[dict]:
+    """Return the club's memberships with `personName`/`personEmail` resolved in batched reads"""
+    rows = roster_rows(club_ref.collection("memberships").select(MEMBERSHIP_FIELDS).stream())
+    people = get_docs_by_id(db, "people", (row.get('personId') for row in rows), field_paths=ROSTER_PERSON_FIELDS)
+    return attach_people(rows, people)
+
+def person_memberships_query(db, person_id: str):
+    """Collection-group query over every club's memberships for one person
+
+    Needs the `memberships.personId` collection-group index from firestore.indexes.json.
+    """
+    return db.collection_group("memberships").where(filter=FieldFilter("personId", "==", person_id))
+
+def person_club_rows(mem_docs: List) -> List[dict]:
+    """Membership snapshots of one person as dicts carrying their id and `clubId`"""
+    rows = roster_rows(mem_docs)
+    for row, mem_doc in zip(rows, mem_docs):
+        row['clubId'] = mem_doc.reference.parent.parent.id
+    return rows
+
+def attach_club_names(rows: List[dict], names: Dict[str, str]) -> List[dict]:
+    """Set `clubName` on a person's membership rows and sort them by it"""
+    for row in rows:
+        row['clubName'] = names.get(row['clubId']) or 'Unknown'
+    rows.sort(key=lambda row: row['clubName'].lower())
+    return rows
+
+def join_person_clubs(db, person_id: str,
+                      club_names: Optional[Callable[[Iterable[str]], Dict[str, str]]] = None) -> List[dict]:
+    """Return the person's memberships with `clubId`/`clubName` resolved in batched reads
+
+    `club_names` replaces the batched clubs read, e.g. with a replica lookup.
+    """
+    rows = person_club_rows(list(person_memberships_query(db, person_id).select(MEMBERSHIP_FIELDS).stream()))
+    club_ids = [row['clubId'] for row in rows]
+    names = club_names(club_ids) if club_names else get_names_by_id(db, "clubs", club_ids)
+    return attach_club_names(rows, names)
@@ -0,0 +1,86 @@
+"""Prefix search over people using normalized, indexed lookup fields."""
+from __future__ import annotations
+import unicodedata
+from typing import Dict, List, Optional
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+# Normalized copies of the searchable person fields, written alongside the originals
+SEARCH_FIELDS = {
+    "name": "nameSearch",
+    "email": "emailSearch",
+    "studentId": "studentIdSearch",
+}
+# Only these fields are returned to the typeahead
+RESULT_FIELDS = ("name", "email", "studentId")
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# High private-use code point; `prefix + _PREFIX_END` is the upper bound of a prefix range
+_PREFIX_END = "\uf8ff"
+
+def normalize(value: Optional[str]) -> Optional[str]:
+    """Lowercase, accent-strip and whitespace-collapse a value for prefix matching"""
+    if not value:
+        return None
+    decomposed = unicodedata.normalize("NFKD", str(value))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.lower().split()) or None
+
+def search_keys(data: Dict) -> Dict[str, Optional[str]]:
+    """Normalized search fields for a person dict (name/email/studentId)"""
+    return {key: normalize(data.get(src)) for src, key in SEARCH_FIELDS.items()}
+
+def with_search_keys(data: Dict) -> Dict:
+    """Copy of a person dict with its normalized search fields filled in"""
+    return {**data, **search_keys(data)}
+
+def search_people(db, query: str, limit: int = DEFAULT_LIMIT) -> List[Dict]:
+    """Top `limit` people whose name, email or student id starts with `query`
+
+    Each field is a bounded range query, so the cost depends on `limit`, not on
+    the size of the people collection. Name matches rank first.
+    """
+    prefix = normalize(query)
+    if not prefix:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    results: Dict[str, Dict] = {}
+    for field in SEARCH_FIELDS.values():
+        if len(results) >= limit:
+            break
+        matches = (
+            db.collection("people")
+            .where(filter=FieldFilter(field, ">=", prefix))
+            .where(filter=FieldFilter(field, "<", prefix + _PREFIX_END))
+            .order_by(field)
+            .select(RESULT_FIELDS)
+            .limit(limit)
+            .stream()
+        )
+        for doc in matches:
+            if doc.id not in results:
+                data = doc.to_dict()
+                results[doc.id] = {"id": doc.id, **{key: data.get(key) for key in RESULT_FIELDS}}
+    return list(results.values())[:limit]
+
+def backfill_search_keys(db, batch_size: int = 500) -> int:
+    """Write missing or stale search fields on every person; returns the number updated"""
+    updated = 0
+    batch = db.batch()
+    pending = 0
+    for doc in db.collection("people").stream():
+        data = doc.to_dict()
+        keys = search_keys(data)
+        if all(data.get(k) == v for k, v in keys.items()):
+            continue
+        batch.update(doc.reference, keys)
+        pending += 1
+        updated += 1
+        if pending >= batch_size:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+    return updated
@@ -0,0 +1,23 @@
+"""Dashboard totals computed with server-side count() aggregation queries."""
+from __future__ import annotations
+from typing import Dict
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+def _count(query) -> int:
+    return int(query.count().get()[0][0].value)
+
+def collect_stats(db) -> Dict[str, int]:
+    """Totals for the landing page; no documents are streamed
+
+    The active-membership total is a collection-group count, which needs the
+    `memberships.status` collection-group index from firestore.indexes.json.
+    """
+    return {
+        "universities": _count(db.collection("universities")),
+        "clubs": _count(db.collection("clubs")),
+        "people": _count(db.collection("people")),
+        "activeMemberships": _count(
+            db.collection_group("memberships").where(filter=FieldFilter("status", "==", "active"))
+        ),
+    }
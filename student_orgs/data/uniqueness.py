@@ -0,0 +1,178 @@
+"""Unique person emails and student ids, enforced with lookup documents.
+
+Each claimed value has a document, e.g. people_by_email/{normalized email},
+holding the owning `personId`. Person writes create, move and release these
+documents in the same transaction as the person, so two people can never hold
+the same value, and finding a person by email or student id is one read.
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+from google.cloud.firestore_v1 import transactional
+
+from data.lookups import get_docs_by_id
+from data.pagination import iter_pages
+from data.search import search_keys, with_search_keys
+
+# Unique person field -> collection of its lookup documents
+LOOKUP_COLLECTIONS = {
+    "email": "people_by_email",
+    "studentId": "people_by_student_id",
+}
+UNIQUE_FIELDS = tuple(LOOKUP_COLLECTIONS)
+
+class DuplicateValue(ValueError):
+    """A unique person field already belongs to another person"""
+
+    def __init__(self, field: str, value: str, person_id: str):
+        super().__init__(f"{field} '{value}' is already used by another person")
+        self.field = field
+        self.value = value
+        self.person_id = person_id
+
+def normalize(value: Optional[str]) -> Optional[str]:
+    """Identity key of an email or student id: trimmed and case-folded, nothing else
+
+    Unlike the search fields, accents and inner spaces are kept, since values
+    differing in them belong to different people.
+    """
+    if value is None:
+        return None
+    return str(value).strip().casefold() or None
+
+def unique_keys(data: Dict) -> Dict[str, str]:
+    """Normalized email/studentId of a person dict, leaving out empty ones"""
+    keys = {name: normalize(data.get(name)) for name in UNIQUE_FIELDS}
+    return {name: key for name, key in keys.items() if key}
+
+def lookup_id(key: str) -> str:
+    """Document id for a normalized value, escaped so it is always a valid id
+
+    quote() leaves '_' and '.' alone and never produces '%5F' or '%2E', so
+    escaping them only where Firestore objects (ids matching __.*__, '.' and
+    '..') cannot collide with another value's id.
+    """
+    doc_id = quote(key, safe="@+-_")
+    if doc_id.startswith("__"):
+        doc_id = "%5F" + doc_id[1:]
+    if doc_id in (".", ".."):
+        doc_id = doc_id.replace(".", "%2E")
+    return doc_id
+
+def lookup_ref(db, name: str, key: str):
+    return db.collection(LOOKUP_COLLECTIONS[name]).document(lookup_id(key))
+
+def find_people(db, keys_by_field: Dict[str, Set[str]]) -> Dict[str, Dict[str, str]]:
+    """Ids of stored people by field and normalized value, for the values in `keys_by_field`
+
+    Reads the lookup documents with batched get_all calls.
+    """
+    found: Dict[str, Dict[str, str]] = {}
+    for name, keys in keys_by_field.items():
+        by_id = {lookup_id(key): key for key in keys}
+        docs = get_docs_by_id(db, LOOKUP_COLLECTIONS[name], by_id, field_paths=["personId"])
+        found[name] = {by_id[doc_id]: (snap.to_dict() or {}).get("personId") for doc_id, snap in docs.items()}
+    return found
+
+def find_person_id(db, name: str, value: Optional[str]) -> Optional[str]:
+    """Id of the person whose `name` field (email or studentId) is `value`, or None"""
+    key = normalize(value)
+    if not key:
+        return None
+    snap = lookup_ref(db, name, key).get()
+    return (snap.to_dict() or {}).get("personId") if snap.exists else None
+
+def _claims(transaction, db, person_id: str, keys: Dict[str, str], values: Dict) -> List[Tuple[object, bool]]:
+    """(lookup ref, already ours) for each key; raises DuplicateValue when another person holds one"""
+    claims = []
+    for name, key in keys.items():
+        ref = lookup_ref(db, name, key)
+        snap = ref.get(transaction=transaction)
+        owner = (snap.to_dict() or {}).get("personId") if snap.exists else None
+        if owner is not None and owner != person_id:
+            raise DuplicateValue(name, values.get(name) or key, owner)
+        claims.append((ref, owner == person_id))
+    return claims
+
+def create_person(db, person_ref, data: Dict) -> None:
+    """Write a new person and claim its email/studentId atomically"""
+    keys = unique_keys(data)
+
+    @transactional
+    def _create(transaction):
+        claims = _claims(transaction, db, person_ref.id, keys, data)
+        transaction.create(person_ref, with_search_keys(data))
+        for ref, _ in claims:
+            transaction.set(ref, {"personId": person_ref.id})
+
+    _create(db.transaction())
+
+def update_person(db, person_ref, fields: Dict) -> None:
+    """Update a person, moving its claims when the email or studentId changes"""
+
+    @transactional
+    def _update(transaction):
+        snap = person_ref.get(transaction=transaction)
+        before = (snap.to_dict() or {}) if snap.exists else {}
+        old_keys = unique_keys(before)
+        new_keys = unique_keys({**before, **fields})
+        claims = _claims(transaction, db, person_ref.id, new_keys, fields)
+        # Search fields come from the merged document, so a partial update keeps the others
+        transaction.update(person_ref, {**fields, **search_keys({**before, **fields})})
+        for ref, ours in claims:
+            if not ours:
+                transaction.set(ref, {"personId": person_ref.id})
+        for name, key in old_keys.items():
+            if new_keys.get(name) != key:
+                transaction.delete(lookup_ref(db, name, key))
+
+    _update(db.transaction())
+
+def release_person(db, person_id: str, data: Dict) -> None:
+    """Delete the lookup documents a removed person held"""
+    refs = [lookup_ref(db, name, key) for name, key in unique_keys(data).items()]
+    if not refs:
+        return
+    batch = db.batch()
+    for snap in db.get_all(refs):
+        if snap.exists and (snap.to_dict() or {}).get("personId") == person_id:
+            batch.delete(snap.reference)
+    batch.commit()
+
+@dataclass
+class LookupBackfill:
+    created: int = 0
+    # (field, value, person id) for people whose value is already held by someone else
+    conflicts: List[Tuple[str, str, str]] = field(default_factory=list)
+
+def backfill_lookups(db, page_size: int = 250) -> LookupBackfill:
+    """Create the lookup documents for people written before they existed
+
+    When several people share a value, the first in document id order (or
+    whoever already holds it) keeps it and the others are reported.
+    """
+    result = LookupBackfill()
+    for page in iter_pages(db.collection("people"), page_size=page_size, fields=UNIQUE_FIELDS):
+        keys_by_person = [(snap.id, unique_keys(snap.to_dict() or {})) for snap in page]
+        wanted: Dict[str, Set[str]] = {name: set() for name in UNIQUE_FIELDS}
+        for _, keys in keys_by_person:
+            for name, key in keys.items():
+                wanted[name].add(key)
+        owners = find_people(db, wanted)
+        batch = db.batch()
+        pending = 0
+        for person_id, keys in keys_by_person:
+            for name, key in keys.items():
+                owner = owners[name].get(key)
+                if owner is None:
+                    owners[name][key] = person_id
+                    batch.set(lookup_ref(db, name, key), {"personId": person_id})
+                    pending += 1
+                elif owner != person_id:
+                    result.conflicts.append((name, key, person_id))
+        if pending:
+            batch.commit()
+            result.created += pending
+    return result
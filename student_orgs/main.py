@@ -1,59 +1,26 @@
 from __future__ import annotations
 import os
-import sys
-from dataclasses import dataclass, asdict
-from datetime import datetime
-from typing import Optional, List
-
-from dotenv import load_dotenv
-import firebase_admin
-from firebase_admin import credentials, firestore
-
-# ── bootstrap
-load_dotenv()
-sa_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-project_id = os.getenv("FIREBASE_PROJECT_ID")
-
-if not sa_path or not os.path.exists(sa_path):
-    print("ERROR: Set GOOGLE_APPLICATION_CREDENTIALS in .env to your service account JSON path.")
-    sys.exit(1)
-
-if not project_id:
-    print("ERROR: Set FIREBASE_PROJECT_ID in .env to your Firebase project id.")
-    sys.exit(1)
-
-cred = credentials.Certificate(sa_path)
-firebase_admin.initialize_app(cred, {"projectId": project_id})
-db = firestore.client()
-
-# ── data classes
-@dataclass
-class University:
-    name: str
-    domain: Optional[str] = None
-    createdAt: datetime = datetime.utcnow()
-
-@dataclass
-class Club:
-    name: str
-    universityId: str
-    description: Optional[str] = None
-    createdAt: datetime = datetime.utcnow()
-
-@dataclass
-class Person:
-    name: str
-    email: Optional[str] = None
-    studentId: Optional[str] = None
-    createdAt: datetime = datetime.utcnow()
-
-@dataclass
-class Membership:
-    personId: str
-    role: str = "member"         # "owner"|"officer"|"member"
-    status: str = "active"       # "active"|"inactive"
-    title: Optional[str] = None
-    createdAt: datetime = datetime.utcnow()
+from typing import TYPE_CHECKING, Optional, List
+
+if TYPE_CHECKING:
+    from firebase_admin import firestore
+
+from data import Club, ClubRepo, Membership, MembershipRepo, Person, PersonRepo, University, UniversityRepo
+from data.bulk_import import import_people, read_rows
+from data.cache import make_cache
+from data.client import db
+from data.export import EXPORTS, export_lines
+from data.uniqueness import DuplicateValue
+
+# The same caches as the web app, so with CACHE_BACKEND=redis the CLI's writes
+# invalidate what the web workers serve
+universities_cache = make_cache("universities", ttl_seconds=float(os.getenv("UNIVERSITIES_CACHE_TTL", "300")))
+stats_cache = make_cache("stats", ttl_seconds=float(os.getenv("STATS_CACHE_TTL", "60")))
+
+universities_repo = UniversityRepo(db, cache=universities_cache)
+clubs_repo = ClubRepo(db)
+people_repo = PersonRepo(db)
+memberships_repo = MembershipRepo(db)
 
 # ── helpers
 def _print_header(title: str):
@@ -82,37 +49,36 @@ def create_university():
     _print_header("Create University")
     name = input("University name: ").strip()
     domain = input("Domain (optional, e.g., uta.edu): ").strip() or None
-    ref = db.collection("universities").document()
-    ref.set(asdict(University(name=name, domain=domain)))
+    ref = universities_repo.add(University(name=name, domain=domain))
     print(f"Created university: {ref.id}")
 
 def list_universities() -> List[firestore.DocumentSnapshot]:
-    snaps = list(db.collection("universities").order_by("name").stream())
+    snaps = universities_repo.list_all()
     for d in snaps:
         print(f"{d.id} :: {d.to_dict()}")
     return snaps
 
 def update_university():
     _print_header("Update University")
-    snaps = list(db.collection("universities").order_by("name").stream())
+    snaps = universities_repo.list_all()
     chosen = _choose(snaps, "university")
     if not chosen: return
     data = chosen.to_dict()
     new_name = input(f"New name (blank keep '{data.get('name')}'): ").strip() or data.get("name")
     new_domain = input(f"New domain (blank keep '{data.get('domain')}'): ").strip() or data.get("domain")
-    chosen.reference.update({"name": new_name, "domain": new_domain})
+    universities_repo.update(chosen.id, {"name": new_name, "domain": new_domain})
     print("Updated.")
 
 def delete_university():
     _print_header("Delete University")
-    snaps = list(db.collection("universities").order_by("name").stream())
+    snaps = universities_repo.list_all()
     chosen = _choose(snaps, "university")
     if not chosen: return
 
     # Danger: if you’ve created clubs under this university, you probably want to stop deletion or cascade.
     confirm = input("Type DELETE to confirm (this does NOT delete clubs): ").strip()
     if confirm == "DELETE":
-        chosen.reference.delete()
+        universities_repo.delete(chosen.id)
         print("Deleted.")
     else:
         print("Cancelled.")
@@ -121,52 +87,45 @@ def delete_university():
 def create_club():
     _print_header("Create Club")
     # pick university
-    u_snaps = list(db.collection("universities").order_by("name").stream())
+    u_snaps = universities_repo.list_all()
     u = _choose(u_snaps, "university")
     if not u: return
 
     name = input("Club name: ").strip()
     description = input("Description (optional): ").strip() or None
 
-    ref = db.collection("clubs").document()
-    ref.set(asdict(Club(name=name, universityId=u.id, description=description)))
+    ref = clubs_repo.add(Club(name=name, universityId=u.id, description=description))
     print(f"Created club: {ref.id}")
 
 def list_clubs():
     _print_header("List Clubs")
-    snaps = list(db.collection("clubs").order_by("name").stream())
+    snaps = clubs_repo.list_all()
     for d in snaps:
         print(f"{d.id} :: {d.to_dict()}")
     return snaps
 
 def update_club():
     _print_header("Update Club")
-    snaps = list(db.collection("clubs").order_by("name").stream())
+    snaps = clubs_repo.list_all()
     chosen = _choose(snaps, "club")
     if not chosen: return
     data = chosen.to_dict()
     new_name = input(f"New name (blank keep '{data.get('name')}'): ").strip() or data.get("name")
     new_desc = input(f"New description (blank keep '{data.get('description')}'): ").strip() or data.get("description")
-    chosen.reference.update({"name": new_name, "description": new_desc})
+    clubs_repo.update(chosen.id, {"name": new_name, "description": new_desc})
     print("Updated.")
 
 def delete_club():
     _print_header("Delete Club")
-    snaps = list(db.collection("clubs").order_by("name").stream())
+    snaps = clubs_repo.list_all()
     chosen = _choose(snaps, "club")
     if not chosen: return
 
     # Also consider cascading delete memberships
     confirm = input("Type DELETE to confirm (this WILL delete memberships under this club): ").strip()
     if confirm == "DELETE":
-        # delete memberships subcollection
-        mem_snaps = list(chosen.reference.collection("memberships").stream())
-        batch = db.batch()
-        for m in mem_snaps:
-            batch.delete(m.reference)
-        batch.delete(chosen.reference)
-        batch.commit()
-        print("Club and its memberships deleted.")
+        removed = clubs_repo.delete(chosen.id, on_progress=lambda n: print(f"  ...{n} memberships deleted"))
+        print(f"Club and its {removed} memberships deleted.")
     else:
         print("Cancelled.")
 
@@ -176,91 +135,98 @@ def create_person():
     name = input("Name: ").strip()
     email = input("Email (optional): ").strip() or None
     sid = input("Student ID (optional): ").strip() or None
-    ref = db.collection("people").document()
-    ref.set(asdict(Person(name=name, email=email, studentId=sid)))
+    try:
+        ref = people_repo.add(Person(name=name, email=email, studentId=sid))
+    except DuplicateValue as exc:
+        print(f"Not created: {exc}.")
+        return
     print(f"Created person: {ref.id}")
 
 def list_people():
     _print_header("List People")
-    snaps = list(db.collection("people").order_by("name").stream())
+    snaps = people_repo.list_all()
     for d in snaps:
         print(f"{d.id} :: {d.to_dict()}")
     return snaps
 
 def update_person():
     _print_header("Update Person")
-    snaps = list(db.collection("people").order_by("name").stream())
+    snaps = people_repo.list_all()
     chosen = _choose(snaps, "person")
     if not chosen: return
     data = chosen.to_dict()
     new_name = input(f"New name (blank keep '{data.get('name')}'): ").strip() or data.get("name")
     new_email = input(f"New email (blank keep '{data.get('email')}'): ").strip() or data.get("email")
     new_sid = input(f"New studentId (blank keep '{data.get('studentId')}'): ").strip() or data.get("studentId")
-    chosen.reference.update({"name": new_name, "email": new_email, "studentId": new_sid})
+    try:
+        people_repo.update(chosen.id, {"name": new_name, "email": new_email, "studentId": new_sid})
+    except DuplicateValue as exc:
+        print(f"Not updated: {exc}.")
+        return
     print("Updated.")
 
 def delete_person():
     _print_header("Delete Person")
-    snaps = list(db.collection("people").order_by("name").stream())
+    snaps = people_repo.list_all()
     chosen = _choose(snaps, "person")
     if not chosen: return
-    # Note: memberships reference personId; we do not cascade delete memberships here.
-    confirm = input("Type DELETE to confirm (memberships that reference this person will be stale): ").strip()
+    confirm = input("Type DELETE to confirm (this WILL delete the person's memberships in every club): ").strip()
     if confirm == "DELETE":
-        chosen.reference.delete()
-        print("Deleted.")
+        removed = people_repo.delete(chosen.id)
+        print(f"Deleted person and {removed} membership(s).")
     else:
         print("Cancelled.")
 
 # ── CRUD: Memberships (under a chosen club)
 def add_membership():
     _print_header("Add Membership to Club")
-    club = _choose(list(db.collection("clubs").order_by("name").stream()), "club")
+    club = _choose(clubs_repo.list_all(), "club")
     if not club: return
-    person = _choose(list(db.collection("people").order_by("name").stream()), "person")
+    query = input("Search person by name, email or student ID: ").strip()
+    matches = people_repo.search(query)
+    found = people_repo.get_many(m["id"] for m in matches)
+    person = _choose([found[m["id"]] for m in matches if m["id"] in found], "person")
     if not person: return
 
     role = input("Role [owner/officer/member] (default member): ").strip() or "member"
     status = input("Status [active/inactive] (default active): ").strip() or "active"
     title = input("Title (optional, e.g., President): ").strip() or None
 
-    mem = Membership(personId=person.id, role=role, status=status, title=title)
-    ref = club.reference.collection("memberships").document()
-    ref.set(asdict(mem))
+    ref = memberships_repo.add(club.id, Membership(personId=person.id, role=role, status=status, title=title))
     print(f"Added membership: {ref.id}")
 
 def list_memberships():
     _print_header("List Memberships in Club")
-    club = _choose(list(db.collection("clubs").order_by("name").stream()), "club")
+    club = _choose(clubs_repo.list_all(), "club")
     if not club: return
-    snaps = list(club.reference.collection("memberships").stream())
+    snaps = memberships_repo.list_for_club(club.id)
     for m in snaps:
         print(f"{m.id} :: {m.to_dict()}")
     return snaps
 
 def update_membership():
     _print_header("Update Membership in Club")
-    club = _choose(list(db.collection("clubs").order_by("name").stream()), "club")
+    club = _choose(clubs_repo.list_all(), "club")
     if not club: return
-    mem = _choose(list(club.reference.collection("memberships").stream()), "membership")
+    mem = _choose(memberships_repo.list_for_club(club.id), "membership")
     if not mem: return
 
     data = mem.to_dict()
     new_role = input(f"Role [owner/officer/member] (blank keep '{data.get('role')}'): ").strip() or data.get("role")
     new_status = input(f"Status [active/inactive] (blank keep '{data.get('status')}'): ").strip() or data.get("status")
     new_title = input(f"Title (blank keep '{data.get('title')}'): ").strip() or data.get("title")
-    mem.reference.update({"role": new_role, "status": new_status, "title": new_title})
+    memberships_repo.update(club.id, mem.id, {"role": new_role, "status": new_status, "title": new_title})
     print("Updated membership.")
 
 def delete_membership():
     _print_header("Delete Membership in Club")
-    club = _choose(list(db.collection("clubs").order_by("name").stream()), "club")
+    club = _choose(clubs_repo.list_all(), "club")
     if not club: return
-    mem = _choose(list(club.reference.collection("memberships").stream()), "membership")
+    mem = _choose(memberships_repo.list_for_club(club.id), "membership")
     if not mem: return
     confirm = input("Type DELETE to confirm: ").strip()
     if confirm == "DELETE":
-        mem.reference.delete()
+        memberships_repo.delete(club.id, mem.id)
         print("Deleted membership.")
     else:
         print("Cancelled.")
@@ -268,11 +234,73 @@ def delete_membership():
 # ── queries you’ll actually use
 def list_club_members(club_id: str):
     print(f"\nMembers of club '{club_id}':")
-    mems = list(db.collection("clubs").document(club_id).collection("memberships").stream())
-    for m in mems:
-        md = m.to_dict()
-        person = db.collection("people").document(md["personId"]).get()
-        print(f"- {person.to_dict().get('name','?')} ({md.get('role')}, {md.get('status')}) title={md.get('title')}")
+    for md in memberships_repo.roster(club_id):
+        name = md['personName'] if md['personName'] != 'Unknown' else '?'
+        print(f"- {name} ({md.get('role')}, {md.get('status')}) title={md.get('title')}")
+
+def list_person_clubs(person_id: str):
+    print(f"\nClubs of person '{person_id}':")
+    for md in memberships_repo.for_person(person_id):
+        print(f"- {md['clubName']} ({md.get('role')}, {md.get('status')}) title={md.get('title')}")
+
+def resume_deletes():
+    _print_header("Resume Interrupted Club Deletes")
+    finished = clubs_repo.resume_deletes()
+    print(f"Finished deleting {finished} club(s).")
+
+def repair_member_counts():
+    _print_header("Recompute Club Member Counts")
+    fixed = clubs_repo.recount_members()
+    print(f"Corrected member counts on {fixed} club(s).")
+
+def rebuild_person_lookups():
+    _print_header("Rebuild Email/Student ID Lookups")
+    result = people_repo.backfill_lookups()
+    for field, value, person_id in result.conflicts:
+        print(f"  {person_id}: {field} '{value}' already belongs to another person")
+    print(f"Created {result.created} lookup(s); {len(result.conflicts)} conflict(s) to resolve by hand.")
+
+def reindex_people_search():
+    _print_header("Rebuild People Search Fields")
+    updated = people_repo.backfill_search_keys()
+    print(f"Updated search fields on {updated} people.")
+
+def import_people_file():
+    _print_header("Import People from CSV/JSONL")
+    path = input("File path (.csv with name,email,studentId columns, or .jsonl): ").strip()
+    if not path: return
+    result = import_people(db, path, on_progress=lambda r: print(
+        f"  ... {r.rows} rows: {r.imported} imported, {r.duplicates} duplicates, {len(r.invalid)} invalid"))
+    for line_no, reason in result.invalid:
+        print(f"  line {line_no}: {reason}")
+    print(f"Imported {result.imported} people; skipped {result.duplicates} duplicate(s) "
+          f"and {len(result.invalid)} invalid row(s).")
+
+def import_club_roster():
+    _print_header("Import Club Roster from CSV/JSONL")
+    club = _choose(clubs_repo.list_all(), "club")
+    if not club: return
+    path = input("File path (.csv with email or studentId, role, status, title columns, or .jsonl): ").strip()
+    if not path: return
+    result = memberships_repo.import_roster(club.id, read_rows(path))
+    for line_no, key in result.unresolved:
+        print(f"  line {line_no}: no person with '{key}'")
+    for line_no, reason in result.invalid:
+        print(f"  line {line_no}: {reason}")
+    print(f"Added {result.added} member(s); skipped {len(result.duplicates)} already in the club, "
+          f"{len(result.unresolved)} not found and {len(result.invalid)} invalid row(s).")
+
+def export_to_file():
+    _print_header("Export to CSV/JSONL")
+    name = input(f"Export [{'/'.join(EXPORTS)}]: ").strip().lower()
+    if name not in EXPORTS:
+        print("Unknown export.")
+        return
+    path = input(f"Output file (.csv or .jsonl, blank for {name}.csv): ").strip() or f"{name}.csv"
+    fmt = "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        fh.writelines(export_lines(db, name, fmt))
+    print(f"Wrote {path}.")
 
 # ── CLI menu
 MENU = """
@@ -281,10 +309,17 @@ Choose an action:
   [C]lub:       5) create  6) list  7) update  8) delete
   [P]erson:     9) create 10) list 11) update 12) delete
   [M]embers:   13) add    14) list 15) update 16) delete
-  [Q]uery:     17) list members of a club
+  [Q]uery:     17) list members of a club  19) list clubs of a person
+  [A]dmin:     18) rebuild people search fields  20) resume interrupted club deletes
+               21) recompute club member counts  22) import people from a file
+               23) import a club roster from a file  24) export to a file
+               25) rebuild email/student ID lookups
   0) exit
 > """
 
+# Every other action may change the dashboard totals
+READ_ONLY_CHOICES = {"2", "6", "10", "14", "17", "19", "24"}
+
 def main():
     while True:
         try:
@@ -314,8 +349,22 @@ def main():
             club_id = input("Enter clubId: ").strip()
             if club_id:
                 list_club_members(club_id)
+        elif choice == "18": reindex_people_search()
+        elif choice == "19":
+            person_id = input("Enter personId: ").strip()
+            if person_id:
+                list_person_clubs(person_id)
+        elif choice == "20": resume_deletes()
+        elif choice == "21": repair_member_counts()
+        elif choice == "22": import_people_file()
+        elif choice == "23": import_club_roster()
+        elif choice == "24": export_to_file()
+        elif choice == "25": rebuild_person_lookups()
         else:
             print("Unknown choice.")
+            continue
+        if choice not in READ_ONLY_CHOICES:
+            stats_cache.invalidate()
 
 if __name__ == "__main__":
     main()
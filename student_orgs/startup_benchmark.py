@@ -0,0 +1,106 @@
+"""Startup benchmark: import time of the app and CLI, and the first client use.
+
+Each run starts a fresh interpreter, so nothing is warm from an earlier
+import. Per entry point it reports how long the import takes, how long the
+first get_db() call takes (credentials, app and client setup), and for the
+app, the first request to "/". Medians over --runs are written as JSON; pass
+an earlier result as --baseline to flag slower imports.
+
+    python startup_benchmark.py --output startup.json
+    FIRESTORE_BACKEND=firestore python startup_benchmark.py --baseline startup.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+ENTRY_POINTS = ("data.client", "main", "app")
+
+# Runs in the child interpreter; prints one JSON line of timings in seconds
+_PROBE = """
+import json, time
+started = time.perf_counter()
+import {module} as module
+imported = time.perf_counter()
+from data.client import get_db
+get_db()
+timings = {{"import": imported - started, "firstClient": time.perf_counter() - imported}}
+if hasattr(module, "app"):
+    module.app.logger.setLevel("WARNING")
+    started = time.perf_counter()
+    module.app.test_client().get("/")
+    timings["firstRequest"] = time.perf_counter() - started
+print(json.dumps(timings))
+"""
+
+# A median import this much slower counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+def probe(module: str, env: Dict[str, str]) -> Dict[str, float]:
+    """Timings of one cold start of `module` in a new interpreter"""
+    result = subprocess.run([sys.executable, "-c", _PROBE.format(module=module)], env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def measure(module: str, runs: int, env: Dict[str, str]) -> Dict[str, float]:
+    """Median milliseconds per phase over `runs` cold starts"""
+    samples = [probe(module, env) for _ in range(runs)]
+    return {f"{phase}Ms": statistics.median(sample[phase] for sample in samples) * 1000
+            for phase in samples[0]}
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    problems = []
+    for module, current in results["entryPoints"].items():
+        previous = baseline.get("entryPoints", {}).get(module)
+        if previous and current["importMs"] > previous["importMs"] * (1 + tolerance):
+            problems.append(f"{module}: import {previous['importMs']:.0f}ms -> {current['importMs']:.0f}ms")
+    return problems
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per entry point")
+    parser.add_argument("--modules", default=",".join(ENTRY_POINTS), help="comma-separated modules to import")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    # Without credentials the in-process backend still shows the import cost
+    env.setdefault("FIRESTORE_BACKEND", "memory")
+    entry_points = {}
+    for module in (name.strip() for name in args.modules.split(",") if name.strip()):
+        entry_points[module] = measure(module, args.runs, env)
+        print(f"  {module:<12} " + "  ".join(f"{phase[:-2]} {value:7.1f}ms"
+                                              for phase, value in entry_points[module].items()), file=sys.stderr)
+
+    results = {
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "backend": env["FIRESTORE_BACKEND"],
+        "runs": args.runs,
+        "entryPoints": entry_points,
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            problems = compare(results, json.load(fh), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
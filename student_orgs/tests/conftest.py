@@ -0,0 +1,14 @@
+"""Shared fixtures: tests run against the in-memory Firestore backend."""
+import os
+import sys
+
+os.environ["FIRESTORE_BACKEND"] = "memory"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from data.memory import MemoryClient  # noqa: E402
+
+@pytest.fixture
+def db():
+    return MemoryClient()
@@ -0,0 +1,18 @@
+import data.client as client
+import app as app_module
+
+def test_async_views_share_one_client(monkeypatch):
+    created = []
+    factory = client.ASYNC_BACKENDS[client.BACKEND]
+    monkeypatch.setitem(client.ASYNC_BACKENDS, client.BACKEND, lambda: created.append(1) or factory())
+    monkeypatch.setattr(client, "_async_client", None)
+    monkeypatch.setitem(app_module.app.view_functions, "club_members", app_module.club_members_async)
+    client.db.collection("clubs").document("async-club").set({"name": "Async"})
+    http = app_module.app.test_client()
+
+    for _ in range(20):
+        response = http.get("/clubs/async-club/members")
+        assert response.status_code == 200
+        assert "calls=2" in response.headers["X-Firestore-Ops"]
+
+    assert len(created) == 1
@@ -0,0 +1,52 @@
+import re
+
+import pytest
+
+import app as app_module
+from data.client import db
+from data.lookups import GET_ALL_CHUNK_SIZE
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "FIRESTORE_BUDGET_STRICT", True)
+    app_module.invalidate_caches()
+    return app_module.app.test_client()
+
+def add_club(club_id, members):
+    club_ref = db.collection("clubs").document(club_id)
+    club_ref.set({"name": club_id, "universityId": "u1"})
+    batch = db.batch()
+    for i in range(members):
+        if i and i % 200 == 0:
+            batch.commit()
+            batch = db.batch()
+        person_id = f"{club_id}-p{i}"
+        batch.set(db.collection("people").document(person_id), {"name": f"Person {i}", "email": f"{person_id}@x.edu"})
+        batch.set(club_ref.collection("memberships").document(person_id), {"personId": person_id, "role": "member"})
+    batch.commit()
+
+def ops(response):
+    return dict(part.split("=") for part in response.headers["X-Firestore-Ops"].split(";"))
+
+@pytest.fixture(params=["sync", "async"])
+def view(request, monkeypatch):
+    if request.param == "async":
+        monkeypatch.setitem(app_module.app.view_functions, "club_members", app_module.club_members_async)
+    return request.param
+
+@pytest.mark.parametrize("members", [0, 150, 450])
+def test_club_roster_stays_within_its_budget(client, view, members):
+    club_id = f"{view}{members}"
+    add_club(club_id, members)
+
+    response = client.get(f"/clubs/{club_id}/members")
+
+    assert response.status_code == 200
+    assert int(ops(response)["calls"]) == 2 + -(-members // GET_ALL_CHUNK_SIZE)
+    assert len(set(re.findall(rb"[a-z]+\d+-p\d+@x\.edu", response.data))) == members
+
+def test_exceeding_a_budget_fails_in_strict_mode(client, monkeypatch):
+    monkeypatch.setattr(app_module, "roster_budget", lambda members: app_module.Budget(calls=1))
+    add_club("small", 3)
+
+    assert client.get("/clubs/small/members").status_code == 500
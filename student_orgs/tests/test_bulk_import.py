@@ -0,0 +1,82 @@
+from data import Person, PersonRepo
+import data.bulk_import as bulk_import
+from data.bulk_import import import_people, import_roster
+
+def write_people(path, count, extra=()):
+    lines = ["name,email,studentId"] + [f"Person {i},p{i}@x.edu,{1000 + i}" for i in range(count)]
+    path.write_text("\n".join(lines + list(extra)) + "\n")
+    return str(path)
+
+def people_count(db):
+    return len(list(db.collection("people").stream()))
+
+def test_import_skips_duplicates_and_invalid_rows(db, tmp_path):
+    PersonRepo(db).add(Person(name="Stored", email="P0@X.edu"))
+    path = write_people(tmp_path / "people.csv", 5, extra=["Again,p1@x.edu,", ",nobody@x.edu,", "No Email,,"])
+
+    result = import_people(db, path, workers=1)
+
+    assert (result.rows, result.imported, result.duplicates) == (8, 5, 2)
+    assert [line for line, _ in result.invalid] == [8]
+    assert people_count(db) == 1 + 5
+    assert not (tmp_path / "people.csv.checkpoint.json").exists()
+
+def test_resume_counts_rows_committed_after_the_last_checkpoint_as_imported(db, tmp_path, monkeypatch):
+    path = write_people(tmp_path / "people.csv", 35, extra=["No Email,,"])
+    save = bulk_import.save_checkpoint
+    saves = []
+
+    def crash_on_second_save(checkpoint_path, state):
+        # The second batch is committed, but the process dies before recording it
+        if saves:
+            raise KeyboardInterrupt
+        saves.append(state["line"])
+        save(checkpoint_path, state)
+    monkeypatch.setattr(bulk_import, "save_checkpoint", crash_on_second_save)
+    try:
+        import_people(db, path, workers=1, batch_size=10)
+    except KeyboardInterrupt:
+        pass
+    assert saves == [11]
+    assert people_count(db) == 20
+    monkeypatch.setattr(bulk_import, "save_checkpoint", save)
+
+    result = import_people(db, path, workers=1, batch_size=10)
+
+    assert (result.rows, result.imported, result.duplicates, result.invalid) == (36, 36, 0, [])
+    assert people_count(db) == 36
+
+def test_parallel_import_writes_every_row_once(db, tmp_path):
+    path = write_people(tmp_path / "people.jsonl", 0)
+    (tmp_path / "people.jsonl").write_text(
+        "".join(f'{{"name": "P{i}", "studentId": "{i}"}}\n' for i in range(250)) + "[1]\n")
+
+    result = import_people(db, path, workers=4, batch_size=20)
+
+    assert (result.rows, result.imported, len(result.invalid)) == (251, 250, 1)
+    assert people_count(db) == 250
+
+def test_roster_import_resolves_people_and_updates_counts(db):
+    people = PersonRepo(db)
+    ada = people.add(Person(name="Ada", email="ada@x.edu", studentId="1")).id
+    bob = people.add(Person(name="Bob", email="bob@x.edu", studentId="2")).id
+    club = db.collection("clubs").document("c1")
+    club.set({"name": "Chess", "memberCount": 0, "activeMemberCount": 0})
+    rows = [
+        (2, {"email": "ADA@x.edu", "role": "officer"}),
+        (3, {"studentId": "2", "status": "inactive"}),
+        (4, {"email": "ada@x.edu"}),
+        (5, {"email": "nobody@x.edu"}),
+        (6, {"email": "bob@x.edu", "role": "captain"}),
+    ]
+
+    result = import_roster(db, club, rows, batch_size=1)
+
+    assert (result.rows, result.added) == (5, 2)
+    assert result.duplicates == [(4, ada)]
+    assert result.unresolved == [(5, "nobody@x.edu")]
+    assert [line for line, _ in result.invalid] == [6]
+    club_data = club.get().to_dict()
+    assert (club_data["memberCount"], club_data["activeMemberCount"]) == (2, 1)
+    # Rerunning adds nobody: everyone is already a member
+    assert import_roster(db, club, rows).duplicates == [(2, ada), (3, bob), (4, ada)]
@@ -0,0 +1,76 @@
+import pytest
+
+from data.cache import CachedSnapshot, LocalRedis, RedisCache, TTLCache
+from data.pagination import Page, paginate
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+@pytest.fixture
+def workers(clock):
+    # Two workers' caches over one shared server
+    server = LocalRedis(clock=clock)
+    return RedisCache(server, "test:universities", ttl_seconds=60), RedisCache(server, "test:universities", ttl_seconds=60)
+
+def test_invalidation_by_one_worker_is_seen_by_the_other(workers):
+    first, second = workers
+    first.set("all", ["A"])
+    assert second.get("all") == ["A"]
+
+    second.invalidate()
+
+    assert first.get("all") is None
+    assert first.get_or_load("all", lambda: ["A", "B"]) == ["A", "B"]
+    assert second.get("all") == ["A", "B"]
+
+def test_entries_expire_after_the_ttl(workers, clock):
+    first, second = workers
+    first.set("all", ["A"])
+
+    clock.now += 59
+    assert second.get("all") == ["A"]
+    clock.now += 1
+    assert second.get("all") is None
+
+def test_ttl_cache_entries_expire(clock):
+    cache = TTLCache(ttl_seconds=60, clock=clock)
+    cache.set("all", ["A"])
+    clock.now += 60
+    assert cache.get("all") is None
+    assert cache.stats()["misses"] == 1
+
+@pytest.mark.parametrize("backend", ["redis", "ttl"])
+def test_value_loaded_during_an_invalidation_is_not_kept(workers, backend):
+    cache, other = workers if backend == "redis" else (TTLCache(),) * 2
+
+    def stale_loader():
+        # Another worker writes and invalidates while this one reads Firestore
+        other.invalidate()
+        return ["stale"]
+
+    assert cache.get_or_load("all", stale_loader) == ["stale"]
+    assert cache.get_or_load("all", lambda: ["fresh"]) == ["fresh"]
+    assert other.get("all") == ["fresh"]
+
+def test_page_of_snapshots_round_trips_through_redis(db, workers):
+    first, second = workers
+    for i, name in enumerate(["Ann", "Bo", "Cy"]):
+        db.collection("people").document(f"p{i}").set({"name": name, "address": {"city": f"City {i}"}})
+    page = paginate(db.collection("people"), page_size=2)
+
+    first.set(("page", 2, None, None), page)
+    cached = second.get(("page", 2, None, None))
+
+    assert isinstance(cached, Page)
+    assert (cached.next_cursor, cached.prev_cursor) == (page.next_cursor, page.prev_cursor)
+    assert all(isinstance(snap, CachedSnapshot) and snap.exists for snap in cached.items)
+    assert [(snap.id, snap.to_dict()) for snap in cached.items] == [(snap.id, snap.to_dict()) for snap in page.items]
+    assert cached.items[1].get("address.city") == "City 1"
@@ -0,0 +1,72 @@
+import pytest
+
+import data.cascade as cascade
+from data.cascade import delete_club_cascade, delete_person_cascade, resume_club_deletes
+from data.counters import add_membership
+
+def add_club(db, club_id, members):
+    club = db.collection("clubs").document(club_id)
+    club.set({"name": club_id})
+    batch = db.batch()
+    for i in range(members):
+        if i and i % 500 == 0:
+            batch.commit()
+            batch = db.batch()
+        batch.set(club.collection("memberships").document(f"m{i:05d}"), {"personId": f"p{i}", "status": "active"})
+    batch.commit()
+    return club
+
+def memberships(club):
+    return len(list(club.collection("memberships").stream()))
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_club_delete_goes_past_the_batch_limit(db, workers):
+    club = add_club(db, "big", 1700)
+    progress = []
+
+    removed = delete_club_cascade(db, club, workers=workers, on_progress=progress.append)
+
+    assert removed == 1700
+    assert memberships(club) == 0 and not club.get().exists
+    assert progress == sorted(progress) and progress[-1] == 1700
+    assert len(progress) == 4
+
+def test_interrupted_club_delete_is_resumed(db, monkeypatch):
+    club = add_club(db, "big", 1700)
+    commit = cascade._commit_deletes
+    commits = []
+
+    def crash_on_third_commit(db, refs):
+        if len(commits) == 2:
+            raise KeyboardInterrupt
+        commits.append(len(refs))
+        return commit(db, refs)
+
+    monkeypatch.setattr(cascade, "_commit_deletes", crash_on_third_commit)
+    with pytest.raises(KeyboardInterrupt):
+        delete_club_cascade(db, club)
+    monkeypatch.undo()
+    assert memberships(club) == 700
+    assert club.get().to_dict()["deleting"] is True
+
+    assert resume_club_deletes(db) == 1
+    assert memberships(club) == 0 and not club.get().exists
+    assert resume_club_deletes(db) == 0
+
+def test_person_delete_decrements_every_club(db):
+    person = db.collection("people").document("p1")
+    person.set({"name": "Ada"})
+    clubs = [db.collection("clubs").document(f"c{i}") for i in range(3)]
+    for club in clubs:
+        club.set({"name": club.id})
+    for i in range(300):
+        add_membership(db, clubs[i % 3], {"personId": "p1", "status": "active" if i % 2 else "inactive"})
+    clubs[2].delete()
+
+    assert delete_person_cascade(db, person) == 300
+
+    assert not person.get().exists
+    for club in clubs[:2]:
+        data = club.get().to_dict()
+        assert (data["memberCount"], data["activeMemberCount"]) == (0, 0)
+    assert not clubs[2].get().exists
@@ -0,0 +1,39 @@
+from data.counters import (ACTIVE_MEMBER_COUNT, MEMBER_COUNT, add_membership, compute_club_counts,
+                           delete_membership, recount_all_clubs, update_membership)
+
+def counts(club_ref):
+    data = club_ref.get().to_dict()
+    return data.get(MEMBER_COUNT, 0), data.get(ACTIVE_MEMBER_COUNT, 0)
+
+def test_counts_follow_adds_status_changes_and_deletes(db):
+    club = db.collection("clubs").document("c1")
+    club.set({"name": "Chess"})
+
+    first = add_membership(db, club, {"personId": "p1", "status": "active"})
+    second = add_membership(db, club, {"personId": "p2", "status": "pending"})
+    assert counts(club) == (2, 1)
+
+    assert update_membership(db, club, second, {"status": "active"})
+    assert counts(club) == (2, 2)
+    assert update_membership(db, club, second, {"role": "officer"})
+    assert counts(club) == (2, 2)
+    assert update_membership(db, club, first, {"status": "inactive"})
+    assert counts(club) == (2, 1)
+
+    assert delete_membership(db, club, second)
+    assert not delete_membership(db, club, second)
+    assert not update_membership(db, club, second, {"status": "active"})
+    assert counts(club) == (1, 0)
+    assert compute_club_counts(club) == {MEMBER_COUNT: 1, ACTIVE_MEMBER_COUNT: 0}
+
+def test_recount_repairs_only_wrong_clubs(db):
+    right = db.collection("clubs").document("right")
+    right.set({"name": "Right"})
+    add_membership(db, right, {"personId": "p1", "status": "active"})
+    wrong = db.collection("clubs").document("wrong")
+    wrong.set({"name": "Wrong", MEMBER_COUNT: 5, ACTIVE_MEMBER_COUNT: 5})
+    wrong.collection("memberships").document("m1").set({"personId": "p1", "status": "pending"})
+
+    assert recount_all_clubs(db) == 1
+    assert counts(wrong) == (1, 0)
+    assert recount_all_clubs(db) == 0
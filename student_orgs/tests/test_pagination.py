@@ -0,0 +1,44 @@
+import base64
+
+from data.pagination import decode_cursor, paginate
+
+NAMES = ["Cy", "Ann", "Bo", "Ann", "Bo", "Dee", "Ann", "Eve"]
+
+def add_people(db):
+    for i, name in enumerate(NAMES):
+        db.collection("people").document(f"p{i}").set({"name": name, "email": f"p{i}@x.edu"})
+    return [doc_id for _, doc_id in sorted((name, f"p{i}") for i, name in enumerate(NAMES))]
+
+def ids(page):
+    return [snap.id for snap in page.items]
+
+def test_forward_and_backward_pages_cover_ties_once(db):
+    expected = add_people(db)
+    people = db.collection("people")
+
+    pages = [paginate(people, page_size=3)]
+    while pages[-1].next_cursor:
+        pages.append(paginate(people, page_size=3, after=pages[-1].next_cursor))
+    assert [ids(page) for page in pages] == [expected[0:3], expected[3:6], expected[6:8]]
+    assert pages[0].prev_cursor is None and pages[-1].next_cursor is None
+
+    back = paginate(people, page_size=3, before=pages[-1].prev_cursor)
+    assert ids(back) == expected[3:6]
+    back = paginate(people, page_size=3, before=back.prev_cursor)
+    assert ids(back) == expected[0:3]
+    assert back.prev_cursor is None and back.next_cursor is not None
+
+def test_fields_limits_the_transfer_but_keeps_the_order_field(db):
+    add_people(db)
+
+    page = paginate(db.collection("people"), page_size=2, fields=["email"])
+
+    assert set(page.items[0].to_dict()) == {"name", "email"}
+    assert decode_cursor(page.next_cursor) == ["Ann", page.items[-1].id]
+
+def test_malformed_cursor_starts_from_the_beginning(db):
+    expected = add_people(db)
+
+    for token in ("not-a-cursor", base64.urlsafe_b64encode(b'["Ann"]').decode()):
+        assert decode_cursor(token) is None
+        assert ids(paginate(db.collection("people"), page_size=2, after=token)) == expected[:2]
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import data.replica as replica
+from data.replica import CollectionReplica
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def test_dead_listener_restarts_a_backoff_after_it_was_seen_down(db, monkeypatch):
+    clock = Clock(1000.0)
+    monkeypatch.setattr(replica.time, "monotonic", clock)
+    db.collection("clubs").document("c1").set({"name": "Chess"})
+    rep = CollectionReplica(db.collection("clubs"), restart_backoff=30).start()
+    assert rep.healthy()
+
+    # Long after the listener was started, it dies
+    clock.now += 3600
+    rep._watch.close()
+    assert not rep.healthy()
+    clock.now += 29
+    assert not rep.healthy()
+    assert rep._watch._closed
+
+    clock.now += 1
+    assert not rep.healthy()
+    assert rep.healthy() and rep.get("c1") is not None
+
+def test_failed_restart_waits_another_backoff(db, monkeypatch):
+    clock = Clock(1000.0)
+    monkeypatch.setattr(replica.time, "monotonic", clock)
+    rep = CollectionReplica(db.collection("clubs"), restart_backoff=30).start()
+    rep._watch.close()
+    rep.healthy()
+
+    clock.now += 30
+    monkeypatch.setattr(rep.collection_ref, "on_snapshot", lambda callback: 1 / 0)
+    assert not rep.healthy()
+    monkeypatch.undo()
+    monkeypatch.setattr(replica.time, "monotonic", clock)
+
+    clock.now += 29
+    rep.healthy()
+    assert rep._watch._closed
+    clock.now += 1
+    rep.healthy()
+    assert rep.healthy()
+
+def test_concurrent_readers_restart_the_listener_once(db, monkeypatch):
+    clock = Clock(1000.0)
+    monkeypatch.setattr(replica.time, "monotonic", clock)
+    rep = CollectionReplica(db.collection("clubs"), restart_backoff=30).start()
+    rep._watch.close()
+    rep.healthy()
+    clock.now += 30
+
+    subscribe = rep.collection_ref.on_snapshot
+    subscriptions = []
+    gate = threading.Event()
+
+    def slow_subscribe(callback):
+        subscriptions.append(callback)
+        gate.wait(5)
+        return subscribe(callback)
+
+    monkeypatch.setattr(rep.collection_ref, "on_snapshot", slow_subscribe)
+    readers = [threading.Thread(target=rep.healthy) for _ in range(8)]
+    for reader in readers:
+        reader.start()
+    time.sleep(0.05)
+    gate.set()
+    for reader in readers:
+        reader.join()
+
+    assert len(subscriptions) == 1
+    assert rep.healthy()
+    assert len(db._watches) == 1
+
+def test_start_unsubscribes_the_previous_listener(db):
+    rep = CollectionReplica(db.collection("clubs")).start()
+    first = rep._watch
+
+    rep.start()
+
+    assert first._closed and not rep._watch._closed
+    assert db._watches == [rep._watch]
@@ -0,0 +1,72 @@
+import pytest
+
+from data import Person, PersonRepo
+from data.uniqueness import DuplicateValue, backfill_lookups, lookup_id
+
+@pytest.fixture
+def people(db):
+    return PersonRepo(db)
+
+def test_duplicate_email_or_student_id_is_rejected(people):
+    people.add(Person(name="Ada", email="Ada@X.edu", studentId="1"))
+
+    with pytest.raises(DuplicateValue) as excinfo:
+        people.add(Person(name="Other", email=" ada@x.EDU ", studentId="2"))
+    assert excinfo.value.field == "email"
+    with pytest.raises(DuplicateValue):
+        people.add(Person(name="Other", email="other@x.edu", studentId="1"))
+    assert len(people.list_all()) == 1
+
+def test_update_moves_claims_and_keeps_search_fields(db, people):
+    ada = people.add(Person(name="Ada", email="ada@x.edu", studentId="1")).id
+    bob = people.add(Person(name="Bob", email="bob@x.edu", studentId="2")).id
+
+    people.update(ada, {"email": "ada@y.edu"})
+
+    stored = db.collection("people").document(ada).get().to_dict()
+    assert (stored["nameSearch"], stored["emailSearch"], stored["studentIdSearch"]) == ("ada", "ada@y.edu", "1")
+    assert people.find_id("email", "ada@y.edu") == ada
+    assert people.find_id("email", "ada@x.edu") is None
+    # The released email can be taken; one still held cannot
+    people.update(bob, {"email": "ada@x.edu"})
+    with pytest.raises(DuplicateValue):
+        people.update(bob, {"studentId": "1"})
+    assert people.find_id("studentId", "2") == bob
+
+def test_delete_releases_claims(people):
+    ada = people.add(Person(name="Ada", email="ada@x.edu", studentId="1")).id
+
+    people.delete(ada)
+
+    assert people.find_id("email", "ada@x.edu") is None
+    people.add(Person(name="Ada again", email="ada@x.edu", studentId="1"))
+
+@pytest.mark.parametrize("key", ["__foo__", "__", ".", "..", "a/b", "_x_"])
+def test_lookup_ids_are_valid_and_distinct(key):
+    doc_id = lookup_id(key)
+    assert "/" not in doc_id
+    assert not (doc_id.startswith("__") and doc_id.endswith("__"))
+    assert doc_id not in (".", "..")
+    others = {"__foo__", "%5F_foo__", "__", ".", "..", "%2E", "a/b", "a%2Fb", "_x_"} - {key}
+    assert doc_id not in {lookup_id(other) for other in others}
+
+def test_backfill_claims_existing_values_and_reports_conflicts(db, people):
+    db.collection("people").document("a").set({"name": "A", "email": "same@x.edu", "studentId": "1"})
+    db.collection("people").document("b").set({"name": "B", "email": "same@x.edu", "studentId": "2"})
+
+    result = backfill_lookups(db)
+
+    assert result.created == 3
+    assert result.conflicts == [("email", "same@x.edu", "b")]
+    assert people.find_id("email", "same@x.edu") == "a"
+    assert backfill_lookups(db).created == 0
+
+def test_accents_and_inner_spaces_make_values_distinct(people):
+    jose = people.add(Person(name="José", email="josé@x.edu", studentId="A 1")).id
+    jose_plain = people.add(Person(name="Jose", email="jose@x.edu", studentId="A1")).id
+
+    assert people.find_id("email", " JOSÉ@x.edu") == jose
+    assert people.find_id("email", "jose@x.edu") == jose_plain
+    assert people.find_id("studentId", "a 1") == jose
+    with pytest.raises(DuplicateValue):
+        people.add(Person(name="Other", email="Jose@X.edu"))